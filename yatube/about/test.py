@@ -1,5 +1,8 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -29,3 +32,22 @@ class StaticURLTests(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.guest_client.get(reverse_name)
                 self.assertTemplateUsed(response, template)
+
+    def test_anonymous_page_without_queries(self):
+        """Шапка анонимной страницы не обращается к базе"""
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('about:author'))
+        self.assertContains(response, 'Войти')
+
+    def test_anonymous_session_from_cache(self):
+        """Сессия анонимного посетителя читается из кэша, а не из базы"""
+        cache.clear()
+        session = SessionStore()
+        session['visited'] = True
+        session.save()
+        self.guest_client.cookies[settings.SESSION_COOKIE_NAME] = (
+            session.session_key
+        )
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('about:author'))
+        self.assertContains(response, 'Войти')
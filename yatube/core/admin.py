@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail, Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'created')
+    list_filter = ('status', 'name')
+    ordering = ('run_at', 'pk')
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'recipient', 'created', 'sent_at', 'attempts', 'failed_at'
+    )
+    search_fields = ('recipient',)
+    exclude = ('message',)
+
+
+admin.site.register(Task, TaskAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.contrib.admin.apps import AdminConfig
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        # mail регистрирует задачу отправки писем
+        from . import mail, signals  # noqa: F401
+
+        # Задачи регистрируются при импорте модулей tasks приложений
+        autodiscover_modules('tasks')
+
+
+class CoreAdminConfig(AdminConfig):
+    # Вход в админку — тот же вход по паролю, что и на сайте
+    default_site = 'core.sites.RateLimitedAdminSite'
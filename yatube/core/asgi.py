@@ -0,0 +1,145 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+# Тело запроса больше этого размера уходит из памяти во временный файл
+BODY_MEMORY_SIZE = 1024 * 1024
+
+
+class ThreadPoolASGIHandler:
+    """
+    ASGI-приложение поверх WSGI-обработчика Django.
+
+    Django 2.2 не умеет выполнять views асинхронно, поэтому цикл событий
+    только принимает соединения и читает тела запросов, а каждый запрос
+    целиком — view, чтение потокового ответа и сигнал request_finished —
+    выполняется в одном потоке пула. У каждого потока свое соединение с
+    базой, так что размер пула ограничивает и число соединений процесса.
+    Медленные клиенты ждут в цикле событий, не занимая потоков.
+    """
+
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемое соединение {scope["type"]}')
+
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        environ = self.build_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.executor, self.handle, environ, send, loop
+            )
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Незавершенные запросы отправляют ответ через этот же
+                # цикл, поэтому их ждет отдельный поток, а не цикл
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.executor.shutdown
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса в файле или None, если клиент отключился."""
+        body = SpooledTemporaryFile(max_size=BODY_MEMORY_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def build_environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('127.0.0.1', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            # В WSGI путь — байты UTF-8, прочитанные как latin-1
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': client[0],
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            value = raw_value.decode('latin-1')
+            if name in environ:
+                # Повторные Cookie склеиваются по RFC 6265, остальные
+                # заголовки — через запятую
+                separator = '; ' if name == 'HTTP_COOKIE' else ','
+                value = f'{environ[name]}{separator}{value}'
+            environ[name] = value
+        return environ
+
+    def handle(self, environ, send, loop):
+        """Выполнить запрос в потоке пула и отправить ответ через цикл."""
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            response_start.update(
+                type='http.response.start',
+                status=int(status.split(' ', 1)[0]),
+                headers=[
+                    (name.encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            )
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            started = False
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not started:
+                    send_message(response_start)
+                    started = True
+                send_message({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            if not started:
+                send_message(response_start)
+            send_message({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
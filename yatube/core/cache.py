@@ -0,0 +1,241 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import cache as default_cache
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+from .metrics import record_cache
+
+MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кэш: LRU в памяти процесса перед общим бэкендом из
+    CACHES (файлы, Redis или locmem для тестов).
+
+    Локальная копия живет не дольше LOCAL_TIMEOUT секунд: изменения из
+    других процессов видны с этой задержкой, свои — сразу, потому что
+    запись и удаление проходят через оба уровня.
+
+    OPTIONS:
+        SHARED — алиас общего кэша в CACHES;
+        LOCAL_MAX_ENTRIES — предел числа записей в памяти процесса;
+        LOCAL_TIMEOUT — срок локальной копии, секунды;
+        LOCK_TIMEOUT — сколько get_or_set ждет чужого вычисления.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', 10000)
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    @cached_property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def local_get(self, key, version):
+        local_key = self.local_key(key, version)
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return MISSING
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._local[local_key]
+                return MISSING
+            self._local.move_to_end(local_key)
+        return pickle.loads(pickled)
+
+    def local_set(self, key, value, timeout, version):
+        local_key = self.local_key(key, version)
+        timeout = self.get_backend_timeout(timeout)
+        local_timeout = self.local_timeout
+        if timeout is not None:
+            local_timeout = min(local_timeout, timeout - time.time())
+        if local_timeout <= 0:
+            self.local_delete(key, version)
+            return
+        # Копия через pickle, как в LocMemCache: изменение объекта после
+        # чтения не портит закэшированное значение
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = time.monotonic() + local_timeout
+        with self._lock:
+            self._local[local_key] = (expires, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def local_delete(self, key, version):
+        with self._lock:
+            self._local.pop(self.local_key(key, version), None)
+
+    def get(self, key, default=None, version=None):
+        value = self.local_get(key, version)
+        record_cache('local', value is not MISSING)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING, version=version)
+        record_cache('shared', value is not MISSING)
+        if value is MISSING:
+            return default
+        self.local_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self.local_set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.local_set(key, value, timeout, version)
+        else:
+            self.local_delete(key, version)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version) or []
+        for key, value in data.items():
+            if key not in failed:
+                self.local_set(key, value, timeout, version)
+        return failed
+
+    def delete(self, key, version=None):
+        self.local_delete(key, version)
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local_delete(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local_delete(key, version)
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local_delete(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        return (
+            self.local_get(key, version) is not MISSING
+            or self.shared.has_key(key, version=version)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    @contextmanager
+    def flight(self, key):
+        """Блокировка вычисления ключа для потоков этого процесса."""
+        with self._lock:
+            lock, users = self._flights.get(key, (threading.Lock(), 0))
+            self._flights[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, users = self._flights[key]
+                if users == 1:
+                    del self._flights[key]
+                else:
+                    self._flights[key] = (lock, users - 1)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Значение из кэша или default(), вычисленное одним потоком на весь
+        общий кэш: остальные потоки и процессы ждут готовый результат, а
+        не нагружают базу одинаковыми запросами одновременно.
+        """
+        value = self.get(key, MISSING, version)
+        if value is not MISSING:
+            return value
+        with self.flight(self.local_key(key, version)):
+            value = self.get(key, MISSING, version)
+            if value is not MISSING:
+                return value
+            lock_key = f'{key}:lock'
+            locked = self.shared.add(
+                lock_key, 1, self.lock_timeout, version=version
+            )
+            if not locked:
+                value = self.wait_for(key, lock_key, version)
+                if value is not MISSING:
+                    return value
+            try:
+                value = default() if callable(default) else default
+                # None не кэшируется, как в BaseCache.get_or_set
+                if value is not None:
+                    self.set(key, value, timeout, version)
+            finally:
+                if locked:
+                    self.shared.delete(lock_key, version=version)
+            return value
+
+    def wait_for(self, key, lock_key, version):
+        """
+        Дождаться значения, которое вычисляет другой процесс. MISSING,
+        если тот закончил, ничего не сохранив, или не успел за
+        LOCK_TIMEOUT.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.shared.get(key, MISSING, version=version)
+            if value is not MISSING:
+                self.local_set(key, value, DEFAULT_TIMEOUT, version)
+                return value
+            if not self.shared.has_key(lock_key, version=version):
+                break
+        return MISSING
+
+
+class Namespace:
+    """
+    Пространство ключей с версией. Версия — время последнего bump(),
+    она входит в каждый ключ, поэтому bump() разом делает устаревшими
+    все ключи пространства, ничего не удаляя.
+    """
+
+    def __init__(self, name, cache=None):
+        self.name = name
+        self.cache = cache or default_cache
+
+    @property
+    def version_key(self):
+        return f'ns:{self.name}'
+
+    def version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, time.time(), None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def key(self, *parts):
+        return ':'.join(map(str, (self.name, self.version(), *parts)))
+
+    def bump(self):
+        self.cache.set(self.version_key, time.time(), None)
+
+    def get_or_set(self, name, default, timeout=DEFAULT_TIMEOUT):
+        return self.cache.get_or_set(self.key(name), default, timeout)
@@ -0,0 +1,224 @@
+import base64
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .metrics import Counter, registry
+from .models import OutgoingEmail
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+mail_messages = Counter(
+    registry, 'yatube_mail_messages_total',
+    'Письма очереди: queued, throttled, sent или failed.', ('result',),
+)
+
+
+def message_data(message):
+    """
+    Письмо в виде словаря для JSON очереди: только адреса, заголовки,
+    тексты и вложения, без объектов Python, которые пришлось бы
+    восстанавливать через pickle.
+    """
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError('Вложения MIMEBase в очередь не ставятся')
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            attachments.append([filename, content, mimetype, False])
+        else:
+            attachments.append([
+                filename, base64.b64encode(content).decode(), mimetype, True
+            ])
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'content_subtype': message.content_subtype,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    }
+
+
+def message_from_data(data, connection=None):
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+        connection=connection,
+    )
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype, encoded in data['attachments']:
+        if encoded:
+            content = base64.b64decode(content)
+        message.attach(filename, content, mimetype)
+    return message
+
+
+def split_by_recipient(message):
+    """
+    Копии письма для каждого получателя: в копии остается один адрес в
+    том же поле (to, cc или bcc). Ограничение числа писем так
+    проверяется для каждого адреса, а не только для первого.
+    """
+    data = message_data(message)
+    seen = set()
+    for field in ('to', 'cc', 'bcc'):
+        for address in getattr(message, field):
+            recipient = address.lower()
+            if recipient in seen:
+                continue
+            seen.add(recipient)
+            yield recipient, json.dumps({
+                **data,
+                'to': [], 'cc': [], 'bcc': [],
+                field: [address],
+            }, ensure_ascii=False)
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Почтовый бэкенд, который только ставит письма в очередь: запрос
+    сброса пароля не ждет SMTP-сервер. Письма отправляет задача
+    send_queued_mail через MAIL_DELIVERY_BACKEND.
+
+    Получателю, которому за MAIL_RECIPIENT_WINDOW секунд уже ушло
+    MAIL_RECIPIENT_LIMIT писем, новые письма не ставятся: серия запросов
+    сброса не засыпает чужой ящик и не тратит квоту отправки. Письмо
+    нескольким адресам ставится копией на каждый адрес, и предел
+    проверяется для каждого.
+    """
+
+    def send_messages(self, email_messages):
+        since = timezone.now() - timedelta(
+            seconds=settings.MAIL_RECIPIENT_WINDOW
+        )
+        copies = [
+            list(split_by_recipient(message)) for message in email_messages
+        ]
+        recipients = {
+            recipient for split in copies for recipient, _ in split
+        }
+        sent = dict(
+            OutgoingEmail.objects.filter(
+                recipient__in=recipients, created__gte=since
+            ).order_by().values('recipient').annotate(
+                total=Count('pk')
+            ).values_list('recipient', 'total')
+        )
+        queued = []
+        accepted = 0
+        for split in copies:
+            before = len(queued)
+            for recipient, data in split:
+                if sent.get(recipient, 0) >= settings.MAIL_RECIPIENT_LIMIT:
+                    mail_messages.inc(result='throttled')
+                    continue
+                sent[recipient] = sent.get(recipient, 0) + 1
+                queued.append(OutgoingEmail(recipient=recipient, message=data))
+            accepted += len(queued) > before
+        if not queued:
+            return 0
+        OutgoingEmail.objects.bulk_create(queued)
+        mail_messages.inc(len(queued), result='queued')
+        send_queued_mail.enqueue(key='core:send_queued_mail')
+        return accepted
+
+
+def ready_emails(now):
+    # Письмо задачи, которая упала, не дойдя до отметки, берется снова
+    return Q(sent_at=None, failed_at=None) & (
+        Q(locked_until=None) | Q(locked_until__lt=now)
+    )
+
+
+@task(max_attempts=8, retry_delay=30)
+def send_queued_mail():
+    """
+    Отправить ожидающие письма пачками по MAIL_BATCH_SIZE через одно
+    соединение. Каждое письмо пробуется один раз за проход: ошибка
+    одного письма не мешает остальным, а после прохода задача падает и
+    повторяется с растущей задержкой. После MAIL_MAX_ATTEMPTS неудач
+    письмо получает failed_at и больше не отправляется.
+    """
+    OutgoingEmail.objects.filter(
+        sent_at__lt=timezone.now() - timedelta(
+            seconds=settings.MAIL_RECIPIENT_WINDOW
+        )
+    ).delete()
+    error = None
+    last_pk = 0
+    connection = get_connection(settings.MAIL_DELIVERY_BACKEND)
+    with connection:
+        while True:
+            now = timezone.now()
+            batch = list(
+                OutgoingEmail.objects.filter(ready_emails(now), pk__gt=last_pk)
+                .order_by('pk')[:settings.MAIL_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for email in batch:
+                # Письмо занимается на время отправки, а не отмечается
+                # отправленным заранее: сбой процесса вернет его в
+                # очередь по истечении MAIL_LOCK_TIMEOUT
+                claimed = OutgoingEmail.objects.filter(
+                    ready_emails(now), pk=email.pk
+                ).update(
+                    attempts=F('attempts') + 1,
+                    locked_until=now + timedelta(
+                        seconds=settings.MAIL_LOCK_TIMEOUT
+                    ),
+                )
+                if not claimed:
+                    continue
+                message = message_from_data(
+                    json.loads(email.message), connection
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as exc:
+                    error = exc
+                    failed = email.attempts + 1 >= settings.MAIL_MAX_ATTEMPTS
+                    OutgoingEmail.objects.filter(pk=email.pk).update(
+                        locked_until=None,
+                        failed_at=timezone.now() if failed else None,
+                        last_error=traceback.format_exc(),
+                    )
+                    if failed:
+                        logger.error(
+                            'Письмо #%s не отправлено за %s попыток',
+                            email.pk, settings.MAIL_MAX_ATTEMPTS,
+                        )
+                        mail_messages.inc(result='failed')
+                    continue
+                OutgoingEmail.objects.filter(pk=email.pk).update(
+                    sent_at=timezone.now(), locked_until=None
+                )
+                mail_messages.inc(result='sent')
+    if error is not None and OutgoingEmail.objects.filter(
+        ready_emails(timezone.now())
+    ).exists():
+        # Повтор задачи с растущей задержкой отправит оставшиеся письма
+        raise error
@@ -0,0 +1,147 @@
+import json
+import logging
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from core.metrics import percentile
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_auth_'
+PASSWORD = 'Bench-password-42'
+
+
+def summarize(timings):
+    """p50/p95 в миллисекундах и число операций в секунду на ядро."""
+    if len(timings) < 2:
+        return {}
+    return {
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        'per_second_per_core': round(1 / statistics.mean(timings), 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет стоимость хешей паролей по профилям '
+        'PASSWORD_HASHER_PROFILES и пропускную способность входа и '
+        'регистрации на одном ядре. С --budget-ms подбирает стоимость '
+        'scrypt и PBKDF2 под бюджет времени на хеш. '
+        'Создает пользователей bench_auth_* и удаляет их в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument(
+            '--budget-ms', type=float,
+            help='Бюджет времени на один хеш для подбора стоимости'
+        )
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        report = {
+            'profile': settings.PASSWORD_HASHER_PROFILE,
+            'hashers': self.measure_hashers(options['rounds']),
+        }
+        try:
+            # Все запросы замера идут с одного адреса и быстро упрутся в
+            # пределы RATELIMITS, а замеряется стоимость самих view
+            with override_settings(RATELIMIT_ENABLED=False):
+                report['login'] = self.measure_login(options['requests'])
+                report['signup'] = self.measure_signup(options['requests'])
+        finally:
+            User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        if options['budget_ms']:
+            report['recommended'] = self.recommend(
+                options['budget_ms'] / 1000, options['rounds']
+            )
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def time_hasher(self, hasher, rounds):
+        salt = hasher.salt()
+        timings = []
+        for number in range(rounds):
+            started = time.perf_counter()
+            hasher.encode(f'{PASSWORD}{number}', salt)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def measure_hashers(self, rounds):
+        results = {}
+        for profile, hashers in settings.PASSWORD_HASHER_PROFILES.items():
+            hasher = import_string(hashers[0])()
+            if hasher.library is not None:
+                try:
+                    hasher._load_library()
+                except ValueError:
+                    # Нет библиотеки хешера, например argon2-cffi
+                    results[profile] = {
+                        'error': 'библиотека не установлена'
+                    }
+                    continue
+            results[profile] = summarize(self.time_hasher(hasher, rounds))
+        return results
+
+    def measure_login(self, requests):
+        user = User.objects.create_user(
+            username=f'{BENCH_PREFIX}login', password=PASSWORD
+        )
+        timings = []
+        for _ in range(requests):
+            client = Client()
+            started = time.perf_counter()
+            response = client.post(
+                reverse('users:login'),
+                {'username': user.username, 'password': PASSWORD},
+            )
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                raise CommandError('Вход не удался')
+        return summarize(timings)
+
+    def measure_signup(self, requests):
+        timings = []
+        for number in range(requests):
+            client = Client()
+            started = time.perf_counter()
+            response = client.post(reverse('users:signup'), {
+                'username': f'{BENCH_PREFIX}{number}',
+                'password1': PASSWORD,
+                'password2': PASSWORD,
+            })
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                raise CommandError('Регистрация не удалась')
+        return summarize(timings)
+
+    def recommend(self, budget, rounds):
+        """Наибольшая стоимость scrypt и PBKDF2, укладывающаяся в бюджет."""
+        pbkdf2 = get_hasher('pbkdf2_sha256')
+        mean = statistics.mean(self.time_hasher(pbkdf2, rounds))
+        # Время PBKDF2 растет линейно с числом итераций
+        iterations = int(pbkdf2.iterations * budget / mean) // 10000 * 10000
+
+        # Время scrypt растет линейно с n, а n — степень двойки
+        work_factor = 2 ** 10
+        while True:
+            doubled = work_factor * 2
+            with override_settings(PASSWORD_SCRYPT_WORK_FACTOR=doubled):
+                scrypt = get_hasher('scrypt')
+                mean = statistics.mean(self.time_hasher(scrypt, rounds))
+            if mean > budget:
+                break
+            work_factor *= 2
+        return {
+            'PASSWORD_PBKDF2_ITERATIONS': max(iterations, 10000),
+            'PASSWORD_SCRYPT_WORK_FACTOR': work_factor,
+        }
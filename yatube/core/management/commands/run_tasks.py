@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.metrics import registry
+from core.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задачи фоновой очереди. Без --once работает, пока не '
+        'остановят, и проверяет очередь раз в TASKS_POLL_INTERVAL секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти'
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            done = run_pending(options['batch_size'])
+            registry.flush()
+            if options['once']:
+                self.stdout.write(f'Выполнено задач: {done}')
+                return
+            if not done:
+                time.sleep(settings.TASKS_POLL_INTERVAL)
@@ -0,0 +1,265 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, как у клиентов Prometheus
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def percentile(values, percent):
+    """
+    Перцентиль percent (от 0 до 100) с линейной интерполяцией между
+    соседними значениями. statistics.quantiles есть только с Python 3.8.
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (
+        (ordered[upper] - ordered[lower]) * (position - lower)
+    )
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def label_key(self, labels):
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.label_key(labels)
+        with self.registry.lock:
+            samples = self.registry.samples[self.name]
+            samples[key] = samples.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self.label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            samples = self.registry.samples[self.name]
+            sample = samples.get(key)
+            if sample is None:
+                # Счетчики корзин (последняя — +Inf), сумма, количество
+                sample = samples[key] = [[0] * (len(self.buckets) + 1), 0, 0]
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+
+class Gauge(Metric):
+    """
+    Текущее значение, которое считается при выдаче метрик: collect()
+    возвращает словарь {кортеж значений меток: значение}.
+    """
+    kind = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(),
+                 collect=None):
+        self.collect = collect
+        super().__init__(registry, name, documentation, labelnames)
+
+    def samples(self):
+        return {
+            self.label_key(dict(zip(self.labelnames, labels))): value
+            for labels, value in self.collect().items()
+        }
+
+
+class Registry:
+    """
+    Метрики процесса. Значения меняются под одной блокировкой, поэтому
+    реестр безопасен для потоков WSGI-сервера. С METRICS_DIR каждый
+    процесс сбрасывает свои значения в файл каталога, а /metrics
+    складывает файлы всех процессов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.metrics = {}
+        self.samples = {}
+        self.pid = os.getpid()
+        self.flushed = 0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        self.samples[metric.name] = {}
+
+    def reset_after_fork(self):
+        # Значения родителя принадлежат его файлу, потомок начинает с нуля
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pid = os.getpid()
+        self.flushed = 0
+        for samples in self.samples.values():
+            samples.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.samples))
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        # Файл процесса пишет один поток: плановый сброс, заставший
+        # другой, пропускается, а принудительный его дожидается
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if (
+                not force
+                and now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+            ):
+                return
+            self.flushed = now
+            snapshot = self.snapshot()
+            path = os.path.join(directory, f'metrics_{self.pid}.json')
+            temporary = f'{path}.tmp'
+            with open(temporary, 'w') as file:
+                json.dump(snapshot, file)
+            os.replace(temporary, path)
+        except OSError:
+            # Метрики не должны ронять запрос, на котором сбрасываются
+            logger.exception('Не удалось сбросить метрики в %s', directory)
+        finally:
+            self.flush_lock.release()
+
+    def collect(self):
+        """Значения всех процессов из METRICS_DIR или только этого."""
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+        self.flush(force=True)
+        total = {name: {} for name in self.metrics}
+        pattern = os.path.join(settings.METRICS_DIR, 'metrics_*.json')
+        for path in glob.glob(pattern):
+            try:
+                with open(path) as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, samples in snapshot.items():
+                if name in total:
+                    merge_samples(total[name], samples)
+        return total
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        collected = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            samples = collected[name]
+            if metric.kind == 'gauge':
+                samples = metric.samples()
+            for key, sample in sorted(samples.items()):
+                labels = dict(zip(metric.labelnames, json.loads(key)))
+                if metric.kind in ('counter', 'gauge'):
+                    lines.append(f'{name}{format_labels(labels)} {sample}')
+                    continue
+                cumulative = 0
+                bounds = [*map(format_value, metric.buckets), '+Inf']
+                for bound, count in zip(bounds, sample[0]):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket'
+                        f'{format_labels({**labels, "le": bound})} '
+                        f'{cumulative}'
+                    )
+                lines.append(
+                    f'{name}_sum{format_labels(labels)} '
+                    f'{format_value(sample[1])}'
+                )
+                lines.append(
+                    f'{name}_count{format_labels(labels)} {sample[2]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def merge_samples(total, samples):
+    for key, sample in samples.items():
+        current = total.get(key)
+        if current is None:
+            total[key] = sample
+        elif isinstance(sample, list):
+            current[0] = [a + b for a, b in zip(current[0], sample[0])]
+            current[1] += sample[1]
+            current[2] += sample[2]
+        else:
+            total[key] = current + sample
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset_after_fork)
+
+request_duration = Histogram(
+    registry, 'yatube_request_duration_seconds',
+    'Время ответа view в секундах.', ('view', 'method'),
+)
+request_queries = Histogram(
+    registry, 'yatube_request_db_queries',
+    'Число SQL-запросов на один ответ view.', ('view',),
+    buckets=QUERY_BUCKETS,
+)
+cache_requests = Counter(
+    registry, 'yatube_cache_requests_total',
+    'Обращения к кэшам приложения: попадания и промахи.',
+    ('cache', 'result'),
+)
+page_depth = Histogram(
+    registry, 'yatube_paginator_page_number',
+    'Номер запрошенной страницы ленты.', ('view',),
+    buckets=PAGE_BUCKETS,
+)
+
+
+def record_cache(name, hit):
+    cache_requests.inc(cache=name, result='hit' if hit else 'miss')
@@ -0,0 +1,149 @@
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry, request_duration, request_queries
+
+logger = logging.getLogger('yatube.requests')
+
+_state = threading.local()
+
+
+class RequestTimings:
+    """Счетчики одного запроса: SQL, отрисовка шаблонов, весь view."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.render_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обертка connection.execute_wrapper: время каждого запроса
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+
+def timed_render(render, context, request):
+    """
+    Отрисовать шаблон, учитывая время в замерах текущего запроса.
+    Вызывается шаблонами core.template_backends.TimedDjangoTemplates.
+    """
+    timings = getattr(_state, 'timings', None)
+    if timings is None:
+        return render(context, request)
+    # render_to_string внутри шаблона уже входит во внешний замер
+    timings.render_depth += 1
+    started = time.perf_counter()
+    try:
+        return render(context, request)
+    finally:
+        timings.render_depth -= 1
+        if not timings.render_depth:
+            timings.render += time.perf_counter() - started
+
+
+def view_label(match):
+    """Имя view с пространством имен приложения: posts:index."""
+    if match is None:
+        return None
+    if match.url_name:
+        return ':'.join([*match.app_names, match.url_name])
+    return match.view_name
+
+
+class RequestTimingMiddleware:
+    """
+    Замеряет для выборки запросов число и время SQL-запросов, время
+    отрисовки шаблонов и время view. Отдает их в заголовке
+    Server-Timing и пишет строкой JSON в лог yatube.requests.
+    Запросы вне выборки проходят без дополнительной работы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        _state.timings = timings
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _state.timings = None
+        view = time.perf_counter() - started
+
+        if settings.REQUEST_TIMING_HEADER:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={timings.db * 1000:.2f};'
+                f'desc="{timings.queries} queries"',
+                f'tpl;dur={timings.render * 1000:.2f}',
+                f'view;dur={view * 1000:.2f}',
+            ))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': view_label(request.resolver_match),
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timings.queries,
+                'db_ms': round(timings.db * 1000, 2),
+                'render_ms': round(timings.render * 1000, 2),
+                'view_ms': round(view * 1000, 2),
+            }))
+        return response
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Пишет в реестр core.metrics время ответа и число SQL-запросов
+    views из пространств имен METRICS_NAMESPACES.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match and set(match.app_names) & set(settings.METRICS_NAMESPACES):
+            view = view_label(match)
+            request_duration.observe(
+                duration, view=view, method=request.method
+            )
+            request_queries.observe(counter.queries, view=view)
+            registry.flush()
+        return response
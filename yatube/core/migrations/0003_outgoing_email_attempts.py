@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток'),
+        ),
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Отправка прекращена'),
+        ),
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='Последняя ошибка'),
+        ),
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Занято отправкой до'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+import base64
+import json
+import pickle
+
+from django.db import migrations, models
+
+
+def pickled_to_json(apps, schema_editor):
+    """Письма очереди из pickle в JSON; формат как у core.mail.message_data."""
+    OutgoingEmail = apps.get_model('core', 'OutgoingEmail')
+    for email in OutgoingEmail.objects.using(
+        schema_editor.connection.alias
+    ).iterator():
+        message = pickle.loads(email.message)
+        attachments = []
+        for attachment in message.attachments:
+            if not isinstance(attachment, tuple):
+                continue
+            filename, content, mimetype = attachment
+            if isinstance(content, str):
+                attachments.append([filename, content, mimetype, False])
+            else:
+                attachments.append([
+                    filename, base64.b64encode(content).decode(),
+                    mimetype, True,
+                ])
+        email.payload = json.dumps({
+            'subject': message.subject,
+            'body': message.body,
+            'content_subtype': message.content_subtype,
+            'from_email': message.from_email,
+            'to': message.to,
+            'cc': message.cc,
+            'bcc': message.bcc,
+            'reply_to': message.reply_to,
+            'headers': message.extra_headers,
+            'alternatives': getattr(message, 'alternatives', []),
+            'attachments': attachments,
+        }, ensure_ascii=False)
+        email.save(update_fields=['payload'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_outgoing_email_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='payload',
+            field=models.TextField(default='', verbose_name='Письмо (JSON)'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(pickled_to_json, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='outgoingemail',
+            name='message',
+        ),
+        migrations.RenameField(
+            model_name='outgoingemail',
+            old_name='payload',
+            new_name='message',
+        ),
+    ]
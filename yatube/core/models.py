@@ -0,0 +1,87 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """Задача фоновой очереди core.tasks; выполненные задачи удаляются."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    args = models.TextField('Аргументы в JSON', default='[]')
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='Пока задача с ключом ждет, такая же не ставится'
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Предел попыток')
+    run_at = models.DateTimeField('Выполнить не раньше')
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+    locked_until = models.DateTimeField(
+        'Занята исполнителем до',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='task_status_run_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо очереди core.mail. Отправленные письма хранятся, пока
+    нужны для ограничения числа писем одному получателю; письма, которые
+    не ушли за MAIL_MAX_ATTEMPTS попыток, остаются с failed_at.
+    """
+    recipient = models.CharField('Получатель', max_length=254)
+    message = models.TextField('Письмо (JSON)')
+    created = models.DateTimeField('Поставлено', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    locked_until = models.DateTimeField(
+        'Занято отправкой до',
+        null=True,
+        blank=True
+    )
+    failed_at = models.DateTimeField(
+        'Отправка прекращена',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['recipient', 'created'],
+                name='email_recipient_created_idx',
+            ),
+            models.Index(fields=['sent_at', 'id'], name='email_sent_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient} #{self.pk}'
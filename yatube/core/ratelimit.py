@@ -0,0 +1,135 @@
+"""
+Ограничение частоты входа, регистрации и сброса пароля.
+
+Счетчики скользящего окна живут в общем кэше RATELIMIT_CACHE, поэтому
+предел общий для всех процессов сайта. На каждое правило хранится два
+счетчика — текущего и прошлого окна, — а число запросов за последние
+window секунд оценивается как
+
+    прошлое * (1 - доля прошедшего текущего окна) + текущее.
+
+Решение стоит одного get_many и одного incr на правило, сколько бы
+запросов ни пришло, а отказ выдается до проверки формы и хеширования
+пароля.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+from .metrics import Counter, Histogram, registry
+
+DECISION_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+)
+
+ratelimit_decisions = Counter(
+    registry, 'yatube_ratelimit_decisions_total',
+    'Решения ограничителя частоты: allowed или rejected.',
+    ('scope', 'result'),
+)
+ratelimit_latency = Histogram(
+    registry, 'yatube_ratelimit_decision_seconds',
+    'Время решения ограничителя частоты.', ('scope',),
+    buckets=DECISION_BUCKETS,
+)
+
+
+def client_ip(request):
+    """
+    Адрес клиента. За RATELIMIT_PROXY_COUNT доверенными прокси это
+    адрес, который дописал в RATELIMIT_IP_HEADER первый из них, считая
+    справа: все, что левее, клиент может подставить сам.
+    """
+    header = settings.RATELIMIT_IP_HEADER
+    if header and request.META.get(header):
+        addresses = [
+            address.strip() for address in request.META[header].split(',')
+        ]
+        if len(addresses) >= settings.RATELIMIT_PROXY_COUNT:
+            return addresses[-settings.RATELIMIT_PROXY_COUNT]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def rule_value(request, field):
+    if field == 'ip':
+        return client_ip(request)
+    return request.POST.get(field, '').strip().lower()
+
+
+def counter_keys(scope, field, value, window, now):
+    digest = hashlib.md5(value.encode()).hexdigest()
+    bucket = int(now // window)
+    prefix = f'ratelimit:{scope}:{field}:{digest}:{window}'
+    return f'{prefix}:{bucket - 1}', f'{prefix}:{bucket}'
+
+
+def check(scope, request, now=None):
+    """
+    Учесть запрос в счетчиках scope. Вернет None, если запрос в
+    пределах всех правил, иначе число секунд до конца текущего окна
+    нарушенного правила. Отклоненные запросы в счетчиках не учитываются.
+    """
+    store = caches[settings.RATELIMIT_CACHE]
+    now = time.time() if now is None else now
+    counters = []
+    for field, limit, window in settings.RATELIMITS[scope]:
+        value = rule_value(request, field)
+        if not value:
+            continue
+        previous_key, current_key = counter_keys(
+            scope, field, value, window, now
+        )
+        counts = store.get_many([previous_key, current_key])
+        elapsed = (now % window) / window
+        estimate = (
+            counts.get(previous_key, 0) * (1 - elapsed)
+            + counts.get(current_key, 0)
+        )
+        if estimate >= limit:
+            return max(1, int(window - now % window))
+        counters.append((current_key, window))
+
+    for key, window in counters:
+        # Счетчик окна нужен еще одно окно как прошлый
+        if not store.add(key, 1, 2 * window):
+            try:
+                store.incr(key)
+            except ValueError:
+                # Счетчик истек между add и incr
+                store.set(key, 1, 2 * window)
+    return None
+
+
+def ratelimit(scope):
+    """
+    Ограничить POST-запросы view правилами RATELIMITS[scope]. Сверх
+    предела отвечает 429 с Retry-After, не вызывая view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST' or not settings.RATELIMIT_ENABLED:
+                return view(request, *args, **kwargs)
+            started = time.perf_counter()
+            retry_after = check(scope, request)
+            ratelimit_latency.observe(
+                time.perf_counter() - started, scope=scope
+            )
+            ratelimit_decisions.inc(
+                scope=scope,
+                result='allowed' if retry_after is None else 'rejected',
+            )
+            if retry_after is None:
+                return view(request, *args, **kwargs)
+            response = render(
+                request, 'core/too_many_requests.html',
+                {'retry_after': retry_after}, status=429,
+            )
+            response['Retry-After'] = str(retry_after)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def reading_from_replicas():
+    """Идут ли чтения текущего потока на реплики."""
+    return bool(settings.REPLICA_DATABASES) and getattr(
+        _state, 'replicas', False
+    )
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтения внутри read_from_replicas идут на реплики из
+    REPLICA_DATABASES, все остальное — на основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replicas():
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+def read_from_replicas(view):
+    """
+    Читать данные view с реплик. Пользователь, который недавно писал,
+    закреплен за основной базой, чтобы сразу увидеть свои изменения.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        # Сессия и пользователь читаются с основной базы: только что
+        # созданной сессии на реплике еще может не быть
+        request.user.is_authenticated
+        _state.replicas = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replicas = False
+    return wrapper
+
+
+def pin_to_primary(response):
+    """Закрепить клиента за основной базой на время задержки реплик."""
+    response.set_cookie(
+        settings.REPLICA_PIN_COOKIE,
+        '1',
+        max_age=settings.REPLICA_PIN_SECONDS,
+        httponly=True,
+    )
+    return response
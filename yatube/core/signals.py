@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_WAL:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+
+
+@receiver(request_finished)
+def remember_connection_use(**kwargs):
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is not None:
+            conn.last_request_finished = now
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """
+    Закрыть оборванное постоянное соединение до того, как запрос
+    получит ошибку; следующий запрос к БД откроет новое. Проверяются
+    только соединения, простоявшие дольше DB_HEALTH_CHECK_IDLE секунд:
+    недавно работавшее соединение почти наверняка живо, а SELECT 1 на
+    каждый запрос стоил бы лишнего обращения к базе.
+    """
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for conn in connections.all():
+        idle_since = getattr(conn, 'last_request_finished', None)
+        if (
+            conn.connection is not None
+            and conn.settings_dict['CONN_MAX_AGE']
+            and not conn.in_atomic_block
+            and idle_since is not None
+            and now - idle_since > settings.DB_HEALTH_CHECK_IDLE
+            and not conn.is_usable()
+        ):
+            conn.close()
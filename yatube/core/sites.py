@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .ratelimit import ratelimit
+
+
+class RateLimitedAdminSite(admin.AdminSite):
+    """Админка, вход в которую ограничен правилами RATELIMITS['login']."""
+
+    def login(self, request, extra_context=None):
+        return ratelimit('login')(super().login)(request, extra_context)
@@ -0,0 +1,236 @@
+"""
+Фоновая очередь задач.
+
+Брокер — таблица core.Task в основной базе: задача записывается в той
+же транзакции, что и изменения, ради которых она ставится, и не
+теряется при перезапуске. Задачи выполняет поток в процессе сайта
+(TASKS_WORKER_THREAD) или отдельный процесс manage.py run_tasks.
+
+    @task(max_attempts=5)
+    def index_post(post_id):
+        ...
+
+    index_post.enqueue(post.pk, key=f'index:{post.pk}')
+
+Задачи с одинаковым ключом, ожидающие выполнения, схлопываются в одну,
+поэтому задача должна читать актуальное состояние, а не получать его
+в аргументах. Упавшая задача повторяется с растущей задержкой, после
+max_attempts попыток остается в таблице с состоянием failed.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .metrics import (LATENCY_BUCKETS, Counter, Gauge, Histogram,
+                      registry)
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Задержка в очереди измеряется секундами и минутами, а не миллисекундами
+TASK_LATENCY_BUCKETS = (*LATENCY_BUCKETS, 30, 60, 300, 900, 3600)
+
+tasks = {}
+
+
+def count_tasks():
+    rows = Task.objects.order_by().values('status').annotate(
+        total=Count('pk')
+    )
+    depth = {(status,): 0 for status, _ in Task.STATUS_CHOICES}
+    depth.update({(row['status'],): row['total'] for row in rows})
+    return depth
+
+
+queue_depth = Gauge(
+    registry, 'yatube_task_queue_depth',
+    'Задачи в очереди по состоянию.', ('status',), collect=count_tasks,
+)
+task_latency = Histogram(
+    registry, 'yatube_task_latency_seconds',
+    'Время от постановки задачи до начала выполнения.', ('task',),
+    buckets=TASK_LATENCY_BUCKETS,
+)
+task_duration = Histogram(
+    registry, 'yatube_task_duration_seconds',
+    'Время выполнения задачи.', ('task',),
+)
+task_runs = Counter(
+    registry, 'yatube_task_runs_total',
+    'Выполнения задач: done, retry или failed.', ('task', 'result'),
+)
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts, retry_delay):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def enqueue(self, *args, key=None, delay=0):
+        """
+        Поставить задачу в очередь. Аргументы должны сериализоваться в
+        JSON. Вернет False, если задача с тем же ключом уже ожидает.
+        """
+        if settings.TASKS_EAGER:
+            self.func(*args)
+            return True
+        try:
+            with transaction.atomic():
+                Task.objects.create(
+                    name=self.name,
+                    args=json.dumps(args),
+                    key=key,
+                    max_attempts=self.max_attempts,
+                    run_at=timezone.now() + timedelta(seconds=delay),
+                )
+        except IntegrityError:
+            return False
+        if settings.TASKS_WORKER_THREAD:
+            transaction.on_commit(worker.wake)
+        return True
+
+
+def task(max_attempts=3, retry_delay=5):
+    """Зарегистрировать функцию как задачу очереди."""
+    def decorator(func):
+        task_function = TaskFunction(func, max_attempts, retry_delay)
+        tasks[task_function.name] = task_function
+        return task_function
+    return decorator
+
+
+def ready_tasks(now):
+    # Задачи исполнителя, который упал, не дойдя до конца, берутся снова
+    return Q(status=Task.PENDING, run_at__lte=now) | Q(
+        status=Task.RUNNING, locked_until__lt=now
+    )
+
+
+def claim(batch_size):
+    """Занять готовые задачи; каждую получает только один исполнитель."""
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(ready_tasks(now))
+        .order_by('run_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    claimed = []
+    for pk in candidates:
+        # Ключ освобождается: изменения после начала выполнения
+        # требуют новой задачи
+        updated = Task.objects.filter(ready_tasks(now), pk=pk).update(
+            status=Task.RUNNING,
+            key=None,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.TASKS_LOCK_TIMEOUT),
+        )
+        if updated:
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at', 'pk'))
+
+
+def execute(job):
+    task_function = tasks.get(job.name)
+    started = timezone.now()
+    task_latency.observe(
+        max((started - job.created).total_seconds(), 0), task=job.name
+    )
+    clock = time.perf_counter()
+    try:
+        if task_function is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        task_function.func(*json.loads(job.args))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+        if task_function is None or job.attempts >= job.max_attempts:
+            Task.objects.filter(pk=job.pk).update(
+                status=Task.FAILED, locked_until=None, last_error=error
+            )
+            result = 'failed'
+        else:
+            delay = task_function.retry_delay * 2 ** (job.attempts - 1)
+            Task.objects.filter(pk=job.pk).update(
+                status=Task.PENDING,
+                locked_until=None,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                last_error=error,
+            )
+            result = 'retry'
+    else:
+        Task.objects.filter(pk=job.pk).delete()
+        result = 'done'
+    task_duration.observe(time.perf_counter() - clock, task=job.name)
+    task_runs.inc(task=job.name, result=result)
+    return result
+
+
+def run_pending(batch_size=100):
+    """Выполнить все готовые задачи; вернет число выполненных."""
+    done = 0
+    while True:
+        jobs = claim(batch_size)
+        if not jobs:
+            return done
+        for job in jobs:
+            execute(job)
+            done += 1
+
+
+class Worker:
+    """
+    Поток процесса сайта, который выполняет задачи. Просыпается после
+    коммита транзакции с новой задачей и раз в TASKS_POLL_INTERVAL
+    секунд — за повторами и задачами, поставленными другими процессами.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def wake(self):
+        self.start()
+        self.event.set()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='tasks', daemon=True
+                )
+                self.thread.start()
+
+    def reset_after_fork(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def run(self):
+        while True:
+            self.event.wait(settings.TASKS_POLL_INTERVAL)
+            self.event.clear()
+            try:
+                run_pending()
+            except Exception:
+                logger.exception('Ошибка исполнителя очереди задач')
+            finally:
+                connections.close_all()
+
+
+worker = Worker()
+os.register_at_fork(after_in_child=worker.reset_after_fork)
@@ -0,0 +1,25 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from .middleware import timed_render
+
+
+class TimedTemplate(Template):
+    def __init__(self, template):
+        super().__init__(template.template, template.backend)
+
+    def render(self, context=None, request=None):
+        return timed_render(super().render, context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Шаблоны Django, время отрисовки которых учитывает
+    RequestTimingMiddleware. Замер включается настройкой BACKEND, а не
+    подменой Template.render во всем процессе.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
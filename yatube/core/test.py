@@ -0,0 +1,699 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from yatube.asgi import application
+
+from .asgi import ThreadPoolASGIHandler
+from .cache import Namespace
+from .hashers import ScryptPasswordHasher, TunedPBKDF2PasswordHasher
+from .metrics import percentile, registry
+from .models import OutgoingEmail, Task
+from .ratelimit import check
+from .signals import check_persistent_connections
+from .tasks import run_pending, task
+from .warmup import project_template_names, warm_templates
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def test_warmup_covers_project_templates(self):
+        """Прогрев разбирает все шаблоны проекта"""
+        names = set(project_template_names())
+        for name in (
+            'base.html',
+            'includes/header.html',
+            'posts/index.html',
+            'posts/includes/paginator.html',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+        self.assertEqual(warm_templates(), len(names))
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ содержит замеры SQL, шаблонов и view"""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'view;dur=[\d.]+')
+
+    def test_json_log_line(self):
+        """Замеры пишутся в лог строкой JSON с именем view"""
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['render_ms'], 0)
+        self.assertGreaterEqual(record['view_ms'], record['db_ms'])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        """Запрос вне выборки не замеряется"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class PercentileTests(SimpleTestCase):
+    def test_interpolates_between_values(self):
+        values = [4, 1, 3, 2]
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 50), 2.5)
+        self.assertEqual(percentile(values, 100), 4)
+        self.assertAlmostEqual(percentile(values, 95), 3.85)
+
+    def test_single_value(self):
+        self.assertEqual(percentile([7], 99), 7)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        for samples in registry.samples.values():
+            samples.clear()
+
+    def test_metrics_exposition(self):
+        """/metrics отдает гистограммы views и обращения к кэшу"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('about:author'))
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds histogram', content
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="posts:index",method="GET"} 2',
+            content
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="about:author",method="GET",le="+Inf"} 1',
+            content
+        )
+        self.assertIn(
+            'yatube_cache_requests_total'
+            '{cache="feed_page",result="hit"} 1',
+            content
+        )
+        self.assertIn(
+            'yatube_paginator_page_number_count{view="posts:index"} 1',
+            content
+        )
+        self.assertNotIn('view="metrics"', content)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """С METRICS_TOKEN /metrics требует токен"""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_shared_directory(self):
+        """В режиме METRICS_DIR значения процессов складываются"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        other_process = {
+            name: {} for name in registry.metrics
+        }
+        other_process['yatube_request_db_queries'] = {
+            '["posts:index"]': [[0] * 12, 6, 2],
+        }
+        other_process['yatube_request_db_queries'][
+            '["posts:index"]'
+        ][0][3] = 2
+        with open(os.path.join(directory, 'metrics_1.json'), 'w') as file:
+            json.dump(other_process, file)
+
+        with self.settings(METRICS_DIR=directory):
+            self.client.get(reverse('posts:index'))
+            content = self.client.get('/metrics').content.decode()
+        self.assertIn(
+            'yatube_request_db_queries_count{view="posts:index"} 3', content
+        )
+        self.assertTrue(os.path.exists(
+            os.path.join(directory, f'metrics_{os.getpid()}.json')
+        ))
+
+    def test_concurrent_flushes(self):
+        """Одновременные сбросы не мешают друг другу"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        errors = []
+
+        def flush():
+            try:
+                for _ in range(50):
+                    registry.flush(force=True)
+            except Exception as error:
+                errors.append(error)
+
+        with self.settings(METRICS_DIR=directory):
+            threads = [threading.Thread(target=flush) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+
+    def test_flush_error_does_not_break_request(self):
+        """Ошибка записи метрик пишется в лог, а запрос проходит"""
+        directory = os.path.join(tempfile.gettempdir(), 'нет', 'каталога')
+        with self.settings(
+            METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=0
+        ):
+            with self.assertLogs('core.metrics', 'ERROR'):
+                response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+
+class ThreadPoolASGIHandlerTests(SimpleTestCase):
+    def call(self, scope, body=b''):
+        messages = []
+        incoming = [{'type': 'http.request', 'body': body}]
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return messages
+
+    def http_scope(self, path, query_string=b''):
+        return {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': query_string,
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80),
+        }
+
+    def test_http_request(self):
+        """Запрос проходит через WSGI-обработчик в пуле потоков"""
+        messages = self.call(self.http_scope(reverse('about:author')))
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(
+            (b'Content-Type', b'text/html; charset=utf-8'),
+            messages[0]['headers']
+        )
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        self.assertIn('Об авторе'.encode(), body)
+        self.assertFalse(messages[-1].get('more_body', False))
+
+    def test_not_found(self):
+        """Ответ с ошибкой тоже доходит до клиента"""
+        messages = self.call(self.http_scope('/нет/', b'a=1'))
+        self.assertEqual(messages[0]['status'], 404)
+
+    def test_repeated_headers(self):
+        """Повторные Cookie склеиваются через '; ', остальные — через ','"""
+        scope = self.http_scope('/')
+        scope['headers'] += [
+            (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+            (b'accept', b'text/html'), (b'accept', b'*/*'),
+        ]
+        handler = ThreadPoolASGIHandler(application.wsgi_application, 1)
+        environ = handler.build_environ(scope, None)
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+
+    def test_lifespan(self):
+        """Приложение отвечает на события запуска и остановки"""
+        handler = ThreadPoolASGIHandler(application.wsgi_application, 1)
+        incoming = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        messages = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            messages.append(message['type'])
+
+        asyncio.run(handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            messages,
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 3},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-tests',
+    },
+})
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['shared']
+        self.cache.clear()
+
+    def test_local_tier_is_bounded(self):
+        """Локальный уровень хранит не больше LOCAL_MAX_ENTRIES записей"""
+        for number in range(5):
+            self.cache.set(f'key{number}', number)
+        self.assertEqual(len(self.cache._local), 3)
+        # Вытесненные записи остаются в общем кэше
+        self.assertEqual(self.cache.get('key0'), 0)
+
+    def test_local_copy_and_shared_changes(self):
+        """Чтение идет из локальной копии, запись и удаление — в оба уровня"""
+        self.cache.set('key', 'значение')
+        self.shared.set('key', 'из другого процесса')
+        self.assertEqual(self.cache.get('key'), 'значение')
+
+        self.cache.delete('key')
+        self.assertIsNone(self.shared.get('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_local_copy_expires(self):
+        """Локальная копия живет не дольше LOCAL_TIMEOUT"""
+        self.cache.local_timeout = 0.01
+        self.cache.set('key', 'старое')
+        self.shared.set('key', 'новое')
+        time.sleep(0.02)
+        self.assertEqual(self.cache.get('key'), 'новое')
+
+    def test_single_flight(self):
+        """Одновременные промахи вычисляют значение один раз"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'готово'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.cache.get_or_set('slow', compute)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['готово'] * 5)
+
+    def test_namespace_bump(self):
+        """bump() делает устаревшими все ключи пространства"""
+        namespace = Namespace('tests', self.cache)
+        self.assertEqual(namespace.get_or_set('value', lambda: 1), 1)
+        self.assertEqual(namespace.get_or_set('value', lambda: 2), 1)
+        namespace.bump()
+        self.assertEqual(namespace.get_or_set('value', lambda: 2), 2)
+
+    def test_hit_and_miss_counters(self):
+        """Попадания и промахи уровней считаются в метриках"""
+        for samples in registry.samples.values():
+            samples.clear()
+        self.cache.get('missing')
+        self.cache.set('key', 1)
+        self.cache.get('key')
+        samples = registry.samples['yatube_cache_requests_total']
+        self.assertEqual(samples['["local", "hit"]'], 1)
+        self.assertEqual(samples['["local", "miss"]'], 1)
+        self.assertEqual(samples['["shared", "miss"]'], 1)
+
+
+calls = []
+
+
+@task(max_attempts=2, retry_delay=0)
+def record_call(value):
+    calls.append(value)
+
+
+@task(max_attempts=2, retry_delay=0)
+def always_fails():
+    raise RuntimeError('сбой')
+
+
+@override_settings(TASKS_EAGER=False, TASKS_WORKER_THREAD=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_runs_later(self):
+        """Задача ждет исполнителя, выполненная удаляется"""
+        self.assertTrue(record_call.enqueue(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_key_deduplicates_pending_tasks(self):
+        """Ожидающие задачи с одним ключом схлопываются"""
+        self.assertTrue(record_call.enqueue(1, key='same'))
+        self.assertFalse(record_call.enqueue(2, key='same'))
+        run_pending()
+        self.assertEqual(calls, [1])
+        # После выполнения ключ снова свободен
+        self.assertTrue(record_call.enqueue(3, key='same'))
+
+    def test_delayed_task_waits(self):
+        record_call.enqueue(1, delay=60)
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failed_task_is_retried_then_kept(self):
+        """Упавшая задача повторяется и после предела остается с ошибкой"""
+        always_fails.enqueue()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(run_pending(), 2)
+        job = Task.objects.get()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('сбой', job.last_error)
+
+    def test_run_tasks_command(self):
+        record_call.enqueue(1)
+        call_command('run_tasks', '--once', stdout=StringIO())
+        self.assertEqual(calls, [1])
+
+    def test_queue_metrics(self):
+        """/metrics отдает глубину очереди и задержку задач"""
+        record_call.enqueue(1)
+        content = self.client.get('/metrics').content.decode()
+        self.assertIn('yatube_task_queue_depth{status="pending"} 1', content)
+        run_pending()
+        content = self.client.get('/metrics').content.decode()
+        self.assertIn('yatube_task_queue_depth{status="pending"} 0', content)
+        self.assertIn(
+            'yatube_task_latency_seconds_count{task="core.test.record_call"}',
+            content
+        )
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    MAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    MAIL_RECIPIENT_LIMIT=2,
+    TASKS_EAGER=False,
+    TASKS_WORKER_THREAD=False,
+)
+class QueuedEmailBackendTests(TestCase):
+    def send(self, to='user@example.com'):
+        return mail.send_mail('Тема', 'Текст', 'site@example.com', [to])
+
+    def test_mail_is_sent_in_background(self):
+        """Письмо уходит задачей очереди, а не в запросе"""
+        self.assertEqual(self.send(), 1)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutgoingEmail.objects.filter(sent_at=None).count(), 1)
+
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertFalse(OutgoingEmail.objects.filter(sent_at=None).exists())
+
+    def test_batch_uses_one_connection(self):
+        """Все письма очереди уходят через одно соединение"""
+        self.send('a@example.com')
+        self.send('b@example.com')
+        # Одна задача отправки на все письма
+        self.assertEqual(Task.objects.count(), 1)
+        run_pending()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIs(mail.outbox[0].connection, mail.outbox[1].connection)
+
+    def test_recipient_limit(self):
+        """Сверх предела письма одному адресу не ставятся"""
+        self.assertEqual(self.send('User@example.com'), 1)
+        self.assertEqual(self.send('user@example.com'), 1)
+        self.assertEqual(self.send('user@example.com'), 0)
+        self.assertEqual(self.send('other@example.com'), 1)
+        run_pending()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_recipient_limit_checks_every_recipient(self):
+        """Предел проверяется для каждого адреса письма, а не для первого"""
+        self.send('user@example.com')
+        self.send('user@example.com')
+        message = mail.EmailMessage(
+            'Тема', 'Текст', 'site@example.com',
+            to=['other@example.com'], cc=['user@example.com'],
+        )
+        self.assertEqual(message.send(), 1)
+        run_pending()
+        self.assertEqual(
+            [(message.to, message.cc) for message in mail.outbox[2:]],
+            [(['other@example.com'], [])]
+        )
+
+    def test_message_is_stored_as_json(self):
+        """В очереди письмо хранится в JSON со вложениями и HTML"""
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'site@example.com', ['user@example.com'],
+            headers={'X-Test': '1'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        message.send()
+        stored = json.loads(OutgoingEmail.objects.get().message)
+        self.assertEqual(stored['to'], ['user@example.com'])
+
+        run_pending()
+        sent = mail.outbox[0]
+        self.assertEqual(sent.subject, 'Тема')
+        self.assertEqual(sent.extra_headers, {'X-Test': '1'})
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html')])
+        self.assertEqual(
+            sent.attachments,
+            [('data.bin', b'\x00\xff', 'application/octet-stream')]
+        )
+
+    def test_failed_delivery_is_retried(self):
+        """Неотправленные письма остаются в очереди до повтора"""
+        self.send()
+        broken = 'core.test.BrokenBackend'
+        with override_settings(MAIL_DELIVERY_BACKEND=broken):
+            with self.assertLogs('core.tasks', 'ERROR'):
+                run_pending()
+        self.assertEqual(OutgoingEmail.objects.filter(sent_at=None).count(), 1)
+        self.assertEqual(Task.objects.get().status, Task.PENDING)
+
+        Task.objects.update(run_at=timezone.now())
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(MAIL_DELIVERY_BACKEND='core.test.RejectingBackend')
+    def test_failing_message_does_not_block_queue(self):
+        """Письмо с ошибкой не задерживает следующие"""
+        self.send('user@invalid')
+        self.send('user@example.com')
+        with self.assertLogs('core.tasks', 'ERROR'):
+            run_pending()
+        self.assertEqual(
+            [message.to for message in mail.outbox], [['user@example.com']]
+        )
+        rejected = OutgoingEmail.objects.get(recipient='user@invalid')
+        self.assertEqual(rejected.attempts, 1)
+        self.assertIsNone(rejected.sent_at)
+        self.assertIn('Адрес отклонен', rejected.last_error)
+
+    @override_settings(
+        MAIL_DELIVERY_BACKEND='core.test.RejectingBackend',
+        MAIL_MAX_ATTEMPTS=2,
+    )
+    def test_message_gives_up_after_max_attempts(self):
+        """После MAIL_MAX_ATTEMPTS неудач письмо больше не отправляется"""
+        self.send('user@invalid')
+        with self.assertLogs('core.tasks', 'ERROR'):
+            run_pending()
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.mail', 'ERROR'):
+            run_pending()
+        rejected = OutgoingEmail.objects.get()
+        self.assertEqual(rejected.attempts, 2)
+        self.assertIsNotNone(rejected.failed_at)
+        # Задача не повторяется ради отклоненного письма
+        self.assertFalse(Task.objects.exists())
+
+    def test_claimed_message_returns_after_lock(self):
+        """Письмо упавшей задачи не теряется, а ждет конца блокировки"""
+        self.send()
+        OutgoingEmail.objects.update(
+            locked_until=timezone.now() + timedelta(minutes=5)
+        )
+        run_pending()
+        self.assertEqual(mail.outbox, [])
+
+        self.send('other@example.com')
+        OutgoingEmail.objects.update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        run_pending()
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_password_reset_is_queued(self):
+        get_user_model().objects.create_user(
+            username='reader', email='reader@example.com',
+            password='secret-password'
+        )
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'reader@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        run_pending()
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+
+
+class BrokenBackend(mail.backends.base.BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+
+class RejectingBackend(locmem.EmailBackend):
+    """Отклоняет письма на адреса в домене invalid."""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if message.to[0].endswith('@invalid'):
+                raise ValueError('Адрес отклонен сервером')
+        return super().send_messages(email_messages)
+
+
+@override_settings(
+    PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10, PASSWORD_PBKDF2_ITERATIONS=1000
+)
+class PasswordHasherTests(SimpleTestCase):
+    def test_scrypt_roundtrip(self):
+        hasher = ScryptPasswordHasher()
+        encoded = hasher.encode('пароль', hasher.salt())
+        self.assertTrue(encoded.startswith('scrypt$1024$'))
+        self.assertTrue(hasher.verify('пароль', encoded))
+        self.assertFalse(hasher.verify('парол', encoded))
+        self.assertFalse(hasher.must_update(encoded))
+
+    def test_cost_comes_from_settings(self):
+        """Стоимость берется из настроек, старые хеши требуют обновления"""
+        scrypt, pbkdf2 = ScryptPasswordHasher(), TunedPBKDF2PasswordHasher()
+        encoded = [
+            scrypt.encode('пароль', scrypt.salt()),
+            pbkdf2.encode('пароль', pbkdf2.salt()),
+        ]
+        self.assertIn('$1000$', encoded[1])
+        with override_settings(
+            PASSWORD_SCRYPT_WORK_FACTOR=2 ** 11,
+            PASSWORD_PBKDF2_ITERATIONS=2000,
+        ):
+            self.assertTrue(scrypt.must_update(encoded[0]))
+            self.assertTrue(pbkdf2.must_update(encoded[1]))
+            # Старые хеши по-прежнему проверяются
+            self.assertTrue(scrypt.verify('пароль', encoded[0]))
+            self.assertTrue(pbkdf2.verify('пароль', encoded[1]))
+
+
+class BenchAuthTests(TestCase):
+    @override_settings(RATELIMIT_ENABLED=True)
+    def test_requests_above_rate_limit(self):
+        """Замер входа и регистрации не упирается в ограничение частоты"""
+        caches['shared'].clear()
+        out = StringIO()
+        call_command('bench_auth', rounds=2, requests=15, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertIn('p95_ms', report['login'])
+        self.assertIn('p95_ms', report['signup'])
+
+
+@override_settings(RATELIMITS={'test': [('ip', 10, 60)]})
+class SlidingWindowTests(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.request = RequestFactory().post('/')
+
+    def hits(self, count, now):
+        return [check('test', self.request, now) for _ in range(count)]
+
+    def test_limit_within_window(self):
+        self.assertEqual(self.hits(10, now=600), [None] * 10)
+        self.assertEqual(check('test', self.request, now=630), 30)
+
+    def test_previous_window_decays(self):
+        """Запросы прошлого окна учитываются с убывающим весом"""
+        self.hits(10, now=600)
+        # Прошла половина следующего окна: из прошлых учитывается 5
+        self.assertEqual(self.hits(5, now=690), [None] * 5)
+        self.assertIsNotNone(check('test', self.request, now=690))
+        # Через два окна счетчики прошлых запросов уже не учитываются
+        self.assertEqual(self.hits(10, now=780), [None] * 10)
+
+
+class FakeConnection:
+    settings_dict = {'CONN_MAX_AGE': 60}
+    in_atomic_block = False
+    connection = object()
+
+    def __init__(self, last_request_finished):
+        self.last_request_finished = last_request_finished
+        self.is_usable = mock.Mock(return_value=False)
+        self.close = mock.Mock()
+
+
+@override_settings(DB_HEALTH_CHECKS=True, DB_HEALTH_CHECK_IDLE=30)
+class ConnectionHealthCheckTests(SimpleTestCase):
+    def check(self, conn):
+        with mock.patch('core.signals.connections.all', return_value=[conn]):
+            check_persistent_connections()
+
+    def test_recent_connection_not_checked(self):
+        """Недавно работавшее соединение не проверяется"""
+        conn = FakeConnection(time.monotonic())
+        self.check(conn)
+        conn.is_usable.assert_not_called()
+        conn.close.assert_not_called()
+
+    def test_idle_connection_checked(self):
+        conn = FakeConnection(time.monotonic() - 60)
+        self.check(conn)
+        conn.is_usable.assert_called_once_with()
+        conn.close.assert_called_once_with()
@@ -0,0 +1,29 @@
+import os
+
+from django.conf import settings
+from django.template import engines
+
+
+def project_template_names():
+    """Имена всех шаблонов из каталогов TEMPLATES['DIRS'] проекта."""
+    for options in settings.TEMPLATES:
+        for directory in options.get('DIRS', []):
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if filename.endswith('.html'):
+                        path = os.path.join(root, filename)
+                        yield os.path.relpath(path, directory).replace(
+                            os.sep, '/'
+                        )
+
+
+def warm_templates():
+    """
+    Разобрать шаблоны проекта заранее, чтобы кэширующий загрузчик
+    не делал этого на первых запросах. Возвращает число шаблонов.
+    """
+    names = sorted(set(project_template_names()))
+    for engine in engines.all():
+        for name in names:
+            engine.get_template(name)
+    return len(names)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Group, Post
+from .models import Follow, Group, Post
+from .paginators import EstimatedCountPaginator
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -11,11 +12,26 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group'
     )
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
+    # Фильтр по дате дает диапазон pub_date__gte/__lt по индексу, а
+    # date_hierarchy считал бы DISTINCT дат по всей таблице
     list_filter = ('pub_date',)
     list_editable = ('group',)
+    ordering = ('-pub_date', '-id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            # Список групп читается один раз, а не в каждой строке списка
+            formfield.choices = list(formfield.choices)
+        return formfield
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -23,5 +39,12 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,202 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from core.cache import Namespace
+from core.metrics import record_cache
+from core.routers import reading_from_replicas
+
+from .models import Group
+
+# Параметры запроса, от которых зависит содержимое ленты
+PAGE_PARAMS = ('page', 'after', 'before')
+GROUPS = Namespace('posts:groups')
+
+
+def fragment_key(post, variant):
+    """Ключ отрисованного фрагмента поста; новая версия поста — новый ключ."""
+    return f'posts:fragment:{variant}:{post.pk}:{post.version}'
+
+
+def feed_namespace(scope=None):
+    """
+    Пространство ключей области лент: вся лента (по умолчанию),
+    'author:<id>', 'group:<id>' или 'post:<id>'.
+    """
+    return Namespace(f'posts:feed:{scope}' if scope else 'posts:feed')
+
+
+def feed_version(scope=None):
+    """Время последнего изменения постов в области."""
+    return feed_namespace(scope).version()
+
+
+def bump_feed_version(*scopes):
+    """
+    Отметить изменение всей ленты и перечисленных областей. Внутри
+    транзакции версия сдвигается еще раз после коммита: страница,
+    которую параллельный запрос успел нарисовать из незакоммиченного
+    состояния под новой версией, после коммита уже не отдается.
+    """
+    def bump():
+        now = time.time()
+        cache.set_many(
+            {
+                feed_namespace(scope).version_key: now
+                for scope in (None, *scopes)
+            },
+            None
+        )
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def feed_cache_timeout(scope=None):
+    """
+    Время жизни закэшированной страницы или счетчика ленты. Реплика
+    отстает до REPLICA_PIN_SECONDS, поэтому прочитанное с нее вскоре
+    после изменения могло его не увидеть: такое значение живет только
+    до конца этого окна, а не FEED_PAGE_CACHE_TIMEOUT.
+    """
+    if reading_from_replicas():
+        lag_left = feed_version(scope) + settings.REPLICA_PIN_SECONDS
+        lag_left -= time.time()
+        if lag_left > 0:
+            return max(1, int(lag_left))
+    return settings.FEED_PAGE_CACHE_TIMEOUT
+
+
+def feed_count(scope, queryset):
+    """Число постов ленты; пересчитывается после изменения постов."""
+    return feed_namespace(scope).get_or_set(
+        'count', queryset.count, feed_cache_timeout(scope)
+    )
+
+
+def group_choices():
+    """Варианты групп для формы поста без запроса к базе на каждый показ."""
+    return GROUPS.get_or_set(
+        'choices',
+        lambda: list(Group.objects.values_list('pk', 'title')),
+        settings.FEED_PAGE_CACHE_TIMEOUT
+    )
+
+
+def lookup_key(kind, value):
+    return f'posts:lookup:{kind}:{value}'
+
+
+def cached_lookup(kind, value, func):
+    """
+    Закэшировать результат поиска id по адресу страницы, чтобы проверка
+    версии не ходила в БД. Отсутствующие объекты не кэшируются.
+    """
+    key = lookup_key(kind, value)
+    result = cache.get(key)
+    record_cache('lookup', result is not None)
+    if result is None:
+        result = func()
+        if result is not None:
+            cache.set(key, result, settings.FEED_PAGE_CACHE_TIMEOUT)
+    return result
+
+
+def forget_lookup(kind, value):
+    cache.delete(lookup_key(kind, value))
+
+
+def page_address(request):
+    """Адрес страницы ленты без посторонних параметров запроса."""
+    params = '&'.join(
+        f'{name}={request.GET[name]}'
+        for name in PAGE_PARAMS if name in request.GET
+    )
+    return f'{request.path}?{params}'
+
+
+def page_key(request):
+    digest = hashlib.md5(page_address(request).encode()).hexdigest()
+    return feed_namespace().key('page', digest)
+
+
+def cache_anonymous_page(view):
+    """
+    Кэширует страницу ленты для анонимных посетителей.
+
+    Ключ включает версию лент, поэтому новый, измененный или удаленный
+    пост сразу дает новые ключи. Авторизованные пользователи видят
+    свою шапку и получают страницу без кэша.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+
+        rendered = {}
+
+        def render():
+            response = rendered['response'] = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                return response.content, response['Content-Type']
+            return None
+
+        # Промах рисует страницу один раз, одновременные запросы ее ждут
+        cached = cache.get_or_set(
+            page_key(request), render, feed_cache_timeout()
+        )
+        record_cache('feed_page', 'response' not in rendered)
+        if 'response' in rendered:
+            response = rendered['response']
+        else:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def feed_condition(scopes_func):
+    """
+    Conditional GET для ленты или поста: ответ 304 до отрисовки шаблона.
+
+    scopes_func(request, *args, **kwargs) возвращает области версий,
+    от которых зависит страница, или None, если страницы нет.
+    ETag учитывает пользователя, потому что от него зависит шапка;
+    Last-Modified отдается только анонимным посетителям.
+    """
+    def get_versions(request, *args, **kwargs):
+        if not hasattr(request, '_feed_versions'):
+            scopes = scopes_func(request, *args, **kwargs)
+            request._feed_versions = (
+                None if scopes is None
+                else [feed_version(scope) for scope in scopes]
+            )
+        return request._feed_versions
+
+    def etag(request, *args, **kwargs):
+        versions = get_versions(request, *args, **kwargs)
+        if versions is None:
+            return None
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        raw = f'{versions}|{user}|{page_address(request)}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        versions = get_versions(request, *args, **kwargs)
+        if not versions or request.user.is_authenticated:
+            return None
+        return datetime.fromtimestamp(max(versions), tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
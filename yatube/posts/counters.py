@@ -0,0 +1,82 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Group, Post
+
+
+def change_author_count(author_id, delta, field='posts_count'):
+    updated = AuthorStats.objects.filter(
+        author_id=author_id, **{f'{field}__gte': -delta}
+    ).update(**{field: F(field) + delta})
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(author_id=author_id, **{field: delta})
+    except IntegrityError:
+        # Счетчик создан параллельным запросом
+        AuthorStats.objects.filter(author_id=author_id).update(
+            **{field: F(field) + delta}
+        )
+
+
+def change_group_count(group_id, delta):
+    if group_id is None:
+        return
+    Group.objects.filter(pk=group_id, posts_count__gte=-delta).update(
+        posts_count=F('posts_count') + delta
+    )
+
+
+@transaction.atomic
+def rebuild_counters():
+    """
+    Пересчитать счетчики постов авторов и групп по таблице постов и
+    счетчики подписчиков по таблице подписок.
+    """
+    group_totals = (
+        Post.objects.filter(group=OuterRef('pk'))
+        .order_by()
+        .values('group')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Group.objects.update(posts_count=Coalesce(
+        Subquery(group_totals, output_field=IntegerField()), 0
+    ))
+
+    AuthorStats.objects.all().delete()
+    author_totals = (
+        Post.objects.order_by()
+        .values('author')
+        .annotate(total=Count('pk'))
+        .iterator()
+    )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=row['author'], posts_count=row['total'])
+        for row in author_totals
+    )
+
+    follower_totals = (
+        Follow.objects.filter(author=OuterRef('author'))
+        .order_by()
+        .values('author')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    AuthorStats.objects.update(followers_count=Coalesce(
+        Subquery(follower_totals, output_field=IntegerField()), 0
+    ))
+    # Авторы без постов, на которых подписаны
+    without_stats = (
+        Follow.objects.filter(author__post_stats__isnull=True)
+        .order_by()
+        .values('author')
+        .annotate(total=Count('pk'))
+        .iterator()
+    )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=row['author'], followers_count=row['total'])
+        for row in without_stats
+    )
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Group, Post
+
+User = get_user_model()
+
+# Поля выгрузки: имя колонки и путь для values_list
+EXPORTS = {
+    'posts': (Post, (
+        ('id', 'id'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+    )),
+    'groups': (Group, (
+        ('id', 'id'),
+        ('slug', 'slug'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('posts_count', 'posts_count'),
+    )),
+    'authors': (User, (
+        ('id', 'id'),
+        ('username', 'username'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('posts_count', 'post_stats__posts_count'),
+    )),
+}
+FORMATS = ('jsonl', 'csv')
+CHUNK_SIZE = 2000
+
+
+def parse_moment(value, end_of_day=False):
+    """Дата или дата со временем из строки ISO 8601; ValueError иначе."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Некорректная дата: {value}')
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_posts(group=None, author=None, since=None, until=None):
+    posts = Post.objects.all()
+    if group:
+        posts = posts.filter(group__slug=group)
+    if author:
+        posts = posts.filter(author__username=author)
+    if since:
+        posts = posts.filter(pub_date__gte=parse_moment(since))
+    if until:
+        posts = posts.filter(
+            pub_date__lte=parse_moment(until, end_of_day=True)
+        )
+    return posts
+
+
+def export_queryset(kind, group=None, author=None, since=None, until=None):
+    """
+    Queryset выгрузки с фильтрами. Фильтры отбирают посты; группы и
+    авторы выгружаются те, у которых есть отобранные посты. Своя группа
+    или свой автор сужают выгрузку групп или авторов и без постов.
+    """
+    posts = filter_posts(group, author, since, until)
+    if kind == 'groups':
+        queryset = Group.objects.all()
+        if group:
+            queryset = queryset.filter(slug=group)
+        if author or since or until:
+            queryset = queryset.filter(pk__in=posts.values('group_id'))
+        return queryset
+    if kind == 'authors':
+        queryset = User.objects.filter(post_stats__posts_count__gt=0)
+        if author:
+            queryset = queryset.filter(username=author)
+        if group or since or until:
+            queryset = queryset.filter(pk__in=posts.values('author_id'))
+        return queryset
+    return posts
+
+
+def export_chunks(kind, queryset, chunk_size=CHUNK_SIZE, using=None):
+    """
+    Строки выгрузки пачками по первичному ключу: каждая пачка — отдельный
+    запрос WHERE id > последний LIMIT n, в памяти не больше одной пачки.
+    """
+    model, columns = EXPORTS[kind]
+    paths = [path for name, path in columns]
+    queryset = queryset.using(using) if using else queryset
+    queryset = queryset.order_by('pk').values_list(*paths)
+    last_pk = None
+    while True:
+        chunk_queryset = queryset
+        if last_pk is not None:
+            chunk_queryset = queryset.filter(pk__gt=last_pk)
+        rows = list(chunk_queryset[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_chunks(kind, chunks, file_format):
+    """Пачки строк в текст JSONL или CSV, по куску текста на пачку."""
+    names = [name for name, path in EXPORTS[kind][1]]
+    if file_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        for rows in chunks:
+            writer.writerows(
+                [serialize(value) for value in row] for row in rows
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(
+                {name: serialize(value) for name, value in zip(names, row)},
+                ensure_ascii=False
+            ) + '\n'
+            for row in rows
+        )
+
+
+def gzip_stream(parts):
+    """Сжатие gzip потоком, без сборки всего файла в памяти."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for part in parts:
+        data = compressor.compress(part.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind, file_format='jsonl', compress=False,
+                  chunk_size=CHUNK_SIZE, using=None, **filters):
+    """Байты выгрузки kind в формате file_format, по пачкам."""
+    queryset = export_queryset(kind, **filters)
+    parts = encode_chunks(
+        kind, export_chunks(kind, queryset, chunk_size, using), file_format
+    )
+    if compress:
+        return gzip_stream(parts)
+    return (part.encode() for part in parts)
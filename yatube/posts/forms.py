@@ -1,5 +1,6 @@
 from django import forms
 
+from .cache import group_choices
 from .models import Post
 
 
@@ -15,3 +16,8 @@ class PostForm(forms.ModelForm):
             'text': ('Это текст вашего поста'),
             'group': ('Укажите группу, к которой будет относится ваш пост'),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        group = self.fields['group']
+        group.choices = [('', group.empty_label), *group_choices()]
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test import Client
+from django.urls import reverse
+
+from core.metrics import percentile
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_writer_'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает views приложения posts параллельными писателями '
+        '(PostCreate) и читателями (index, profile) и печатает '
+        'пропускную способность, задержки и ошибки блокировок. '
+        'Запускайте только на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        # Ошибки считаются в отчете, трассировки в логе не нужны
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        authors = [
+            User.objects.get_or_create(username=f'{BENCH_PREFIX}{i}')[0]
+            for i in range(options['writers'])
+        ]
+        self.deadline = time.monotonic() + options['duration']
+        self.results = {'write': [], 'read': []}
+        self.errors = {'write': [], 'read': []}
+        self.lock = threading.Lock()
+
+        threads = [
+            threading.Thread(
+                target=self.run, args=('write', self.writer(author))
+            )
+            for author in authors
+        ] + [
+            threading.Thread(
+                target=self.run, args=('read', self.reader(number, authors))
+            )
+            for number in range(options['readers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for kind in ('write', 'read'):
+            self.report(kind, options['duration'])
+
+    def writer(self, author):
+        client = Client()
+        client.force_login(author)
+        return lambda: client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост из нагрузочного теста'},
+        )
+
+    def reader(self, number, authors):
+        client = Client()
+        pages = [reverse('posts:index')] + [
+            reverse('posts:profile', args=[author.username])
+            for author in authors
+        ]
+        counter = iter(range(number, 10 ** 9))
+        return lambda: client.get(pages[next(counter) % len(pages)])
+
+    def run(self, kind, request):
+        timings, failures = [], []
+        try:
+            while time.monotonic() < self.deadline:
+                started = time.perf_counter()
+                try:
+                    response = request()
+                except OperationalError as error:
+                    failures.append(str(error))
+                    continue
+                if response.status_code >= 400:
+                    failures.append(f'HTTP {response.status_code}')
+                    continue
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        with self.lock:
+            self.results[kind].extend(timings)
+            self.errors[kind].extend(failures)
+
+    def report(self, kind, duration):
+        timings, failures = self.results[kind], self.errors[kind]
+        if not timings:
+            self.stdout.write(f'{kind}: нет успешных запросов')
+        else:
+            self.stdout.write(
+                f'{kind}: {len(timings) / duration:.1f} запр/с, '
+                f'p50 {percentile(timings, 50) * 1000:.1f} мс, '
+                f'p95 {percentile(timings, 95) * 1000:.1f} мс'
+            )
+        locked = sum('locked' in failure for failure in failures)
+        self.stdout.write(
+            f'{kind}: ошибок {len(failures)}, из них блокировок {locked}'
+        )
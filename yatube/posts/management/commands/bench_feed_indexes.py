@@ -0,0 +1,141 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_'
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу тестовыми постами и сравнивает планы EXPLAIN '
+        'и время запросов лент index, profile и group_posts '
+        'без составных индексов Post и с ними. '
+        'Запускайте только на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.seed(options)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        queries = self.feed_queries()
+        indexes = Post._meta.indexes
+
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.remove_index(Post, index)
+        try:
+            self.stdout.write(self.style.MIGRATE_HEADING('Без индексов'))
+            self.report(queries, options['runs'])
+        finally:
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(Post, index)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('С индексами'))
+        self.report(queries, options['runs'])
+
+    def seed(self, options):
+        existing = Post.objects.filter(
+            author__username__startswith=BENCH_PREFIX
+        ).count()
+        missing = options['posts'] - existing
+        if missing <= 0:
+            self.stdout.write(f'Используются {existing} готовых постов')
+            return
+
+        authors = list(User.objects.filter(
+            username__startswith=BENCH_PREFIX
+        ).values_list('pk', flat=True))
+        if not authors:
+            User.objects.bulk_create(
+                User(username=f'{BENCH_PREFIX}{i}')
+                for i in range(options['authors'])
+            )
+            authors = list(User.objects.filter(
+                username__startswith=BENCH_PREFIX
+            ).values_list('pk', flat=True))
+
+        groups = list(Group.objects.filter(
+            slug__startswith=BENCH_PREFIX
+        ).values_list('pk', flat=True))
+        if not groups:
+            Group.objects.bulk_create(
+                Group(
+                    title=f'Группа {i}',
+                    slug=f'{BENCH_PREFIX}{i}',
+                    description='Группа для замеров',
+                )
+                for i in range(options['groups'])
+            )
+            groups = list(Group.objects.filter(
+                slug__startswith=BENCH_PREFIX
+            ).values_list('pk', flat=True))
+        groups.append(None)
+
+        started = time.perf_counter()
+        batch_size = options['batch_size']
+        for offset in range(0, missing, batch_size):
+            size = min(batch_size, missing - offset)
+            with transaction.atomic():
+                Post.objects.bulk_create(
+                    Post(
+                        text='Текст поста для замеров',
+                        author_id=random.choice(authors),
+                        group_id=random.choice(groups),
+                    )
+                    for _ in range(size)
+                )
+        self.stdout.write(
+            f'Добавлено {missing} постов '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+
+    def feed_queries(self):
+        """Запросы первой страницы каждой ленты, как их строят views."""
+        author_id = (
+            Post.objects.values('author_id')
+            .annotate(total=Count('id')).order_by('-total')[0]['author_id']
+        )
+        group_id = (
+            Post.objects.exclude(group=None).values('group_id')
+            .annotate(total=Count('id')).order_by('-total')[0]['group_id']
+        )
+        return {
+            'index': Post.objects.feed(),
+            'profile': Post.objects.feed().filter(author_id=author_id),
+            'group_posts': Post.objects.feed().filter(group_id=group_id),
+        }
+
+    def report(self, queries, runs):
+        for name, queryset in queries.items():
+            page = queryset[:settings.PAGE_SIZE]
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                list(page.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name}: медиана {statistics.median(timings):.2f} мс, '
+                f'максимум {max(timings):.2f} мс'
+            )
+            self.stdout.write(page.explain())
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler)
+
+from core.metrics import percentile
+
+HOST = '127.0.0.1'
+
+
+class QuietWSGIServer(ThreadedWSGIServer):
+    # Очередь соединений под сотни одновременных клиентов
+    request_queue_size = 2048
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI (поток на соединение) и '
+        'ASGI (yatube/asgi.py под uvicorn) при множестве одновременных '
+        'клиентов. Серверы запускаются отдельными процессами на текущей '
+        'базе; без установленного uvicorn замер ASGI пропускается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument(
+            '--path', action='append',
+            help='Адрес для запросов, можно несколько; по умолчанию / '
+                 'и /about/author/'
+        )
+        parser.add_argument(
+            '--server', action='append', choices=('wsgi', 'asgi'),
+            help='Какие серверы сравнивать; по умолчанию оба'
+        )
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--serve', choices=('wsgi', 'asgi'), help=(
+                'Служебный режим: запустить сервер в этом процессе'
+            )
+        )
+
+    def handle(self, *args, **options):
+        if options['serve']:
+            return self.serve(options['serve'], options['port'])
+
+        paths = options['path'] or ['/', '/about/author/']
+        results = {}
+        for kind in options['server'] or ('wsgi', 'asgi'):
+            if kind == 'asgi' and find_spec('uvicorn') is None:
+                self.stderr.write('uvicorn не установлен, замер ASGI пропущен')
+                results[kind] = {'skipped': 'uvicorn не установлен'}
+                continue
+            server = self.start_server(kind, options['port'])
+            try:
+                results[kind] = asyncio.run(self.load(
+                    options['port'], paths,
+                    options['clients'], options['requests'],
+                ))
+            finally:
+                server.terminate()
+                server.wait()
+        self.stdout.write(json.dumps({
+            'clients': options['clients'],
+            'requests': options['requests'],
+            'paths': paths,
+            'results': results,
+        }, ensure_ascii=False, indent=2))
+
+    def serve(self, kind, port):
+        if kind == 'wsgi':
+            from django.core.wsgi import get_wsgi_application
+
+            server = QuietWSGIServer((HOST, port), QuietRequestHandler)
+            server.set_app(get_wsgi_application())
+            server.serve_forever()
+            return
+
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('Для замера ASGI установите uvicorn')
+        from yatube.asgi import application
+
+        uvicorn.run(
+            application, host=HOST, port=port, backlog=2048,
+            log_level=logging.WARNING, access_log=False,
+        )
+
+    def start_server(self, kind, port):
+        server = subprocess.Popen(
+            [
+                sys.executable, sys.argv[0], 'bench_servers',
+                '--serve', kind, '--port', str(port),
+            ],
+            stdout=subprocess.DEVNULL,
+            env={**os.environ, 'REQUEST_LOG_LEVEL': 'WARNING'},
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Сервер {kind} не запустился')
+            try:
+                socket.create_connection((HOST, port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Сервер {kind} не ответил за 30 с')
+
+    async def load(self, port, paths, clients, total):
+        queue = asyncio.Queue()
+        for number in range(total):
+            queue.put_nowait(paths[number % len(paths)])
+        timings, errors = [], []
+
+        async def client():
+            while not queue.empty():
+                path = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    status = await self.fetch(port, path)
+                except (OSError, asyncio.TimeoutError) as error:
+                    errors.append(type(error).__name__)
+                    continue
+                if status >= 400:
+                    errors.append(f'HTTP {status}')
+                    continue
+                timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+        result = {
+            'throughput_rps': round(len(timings) / elapsed, 1),
+            'errors': len(errors),
+        }
+        if len(timings) > 1:
+            result.update(
+                p50_ms=round(percentile(timings, 50) * 1000, 1),
+                p95_ms=round(percentile(timings, 95) * 1000, 1),
+                p99_ms=round(percentile(timings, 99) * 1000, 1),
+            )
+        return result
+
+    async def fetch(self, port, path):
+        """Один запрос на новом соединении; возвращает код ответа."""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(HOST, port), timeout=30
+        )
+        try:
+            writer.write(
+                f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+                f'Connection: close\r\n\r\n'.encode()
+            )
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), timeout=30)
+        finally:
+            writer.close()
+        return int(response.split(b' ', 2)[1])
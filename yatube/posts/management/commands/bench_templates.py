@@ -0,0 +1,76 @@
+import statistics
+import time
+from copy import deepcopy
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from core.metrics import percentile
+from posts.forms import PostForm
+from posts.models import Post
+from posts.views import set_pagination
+
+PLAIN_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+CACHED_LOADERS = [('django.template.loaders.cached.Loader', PLAIN_LOADERS)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время отрисовки index.html, post_detail.html и '
+        'create_post.html с обычными и кэширующим загрузчиками шаблонов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=200)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        pages = self.pages(request)
+
+        for title, loaders in (
+            ('Без кэша шаблонов', PLAIN_LOADERS),
+            ('Кэширующий загрузчик', CACHED_LOADERS),
+        ):
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            backend = self.backend(loaders)
+            for name, context in pages.items():
+                timings = []
+                for _ in range(options['runs']):
+                    started = time.perf_counter()
+                    backend.get_template(name).render(context, request)
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f'{name}: медиана {statistics.median(timings):.3f} мс, '
+                    f'p95 {percentile(timings, 95):.3f} мс'
+                )
+
+    def backend(self, loaders):
+        params = deepcopy(settings.TEMPLATES[0])
+        params.pop('BACKEND')
+        params['NAME'] = 'bench'
+        params['APP_DIRS'] = False
+        params['OPTIONS']['loaders'] = loaders
+        return DjangoTemplates(params)
+
+    def pages(self, request):
+        page_obj = set_pagination(request, Post.objects.feed())
+        post = Post.objects.feed().first()
+        pages = {
+            'posts/index.html': {'page_obj': page_obj},
+            'posts/create_post.html': {'form': PostForm(), 'is_edit': False},
+        }
+        if post is not None:
+            pages['posts/post_detail.html'] = {
+                'post': post,
+                'page_obj': set_pagination(
+                    request, post.author.posts.feed()
+                ),
+            }
+        return pages
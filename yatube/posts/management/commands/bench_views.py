@@ -0,0 +1,176 @@
+import json
+import logging
+import random
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import percentile
+from posts.models import Group, Post
+
+from .seed_load import LOAD_PREFIX
+
+User = get_user_model()
+
+SCENARIOS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'post_create',
+    'post_edit',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет views приложения posts через тестовый клиент на данных '
+        'seed_load и печатает JSON с p50/p95/p99 задержки и числом '
+        'запросов к базе для каждого сценария. '
+        'Запускайте только на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Сценарий для замера; по умолчанию все'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', '-o', help='Файл для JSON отчета')
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        self.rng = random.Random(options['seed'])
+        self.load_targets()
+        self.anonymous = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            request = getattr(self, f'request_{name}')
+            results[name] = self.measure(request, options)
+
+        report = json.dumps({
+            'commit': self.git_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'posts': Post.objects.count(),
+            'requests': options['requests'],
+            'cold_cache': options['cold'],
+            'results': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        self.stdout.write(report)
+
+    def load_targets(self):
+        authors = list(
+            User.objects.filter(username__startswith=LOAD_PREFIX)
+            .order_by('pk').values_list('username', flat=True)
+        )
+        if not authors:
+            raise CommandError('Нет данных: сначала запустите seed_load')
+        self.authors = authors
+        self.groups = list(
+            Group.objects.filter(slug__startswith=LOAD_PREFIX)
+            .values_list('slug', flat=True)
+        )
+        # Самый активный автор: его лента и правки — худший случай
+        self.author = User.objects.filter(
+            username__startswith=LOAD_PREFIX
+        ).order_by('-post_stats__posts_count').first()
+        self.own_posts = list(
+            self.author.posts.values_list('pk', flat=True)[:100]
+        )
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first()
+        self.post_ids = range(1, last_pk + 1)
+        self.pages = max(
+            1, min(Post.objects.count() // settings.PAGE_SIZE, 100)
+        )
+
+    def request_index(self):
+        page = self.rng.randint(1, self.pages)
+        return self.anonymous.get(reverse('posts:index'), {'page': page})
+
+    def request_group_posts(self):
+        slug = self.rng.choice(self.groups)
+        return self.anonymous.get(reverse('posts:group_list', args=[slug]))
+
+    def request_profile(self):
+        username = self.rng.choice(self.authors)
+        return self.anonymous.get(reverse('posts:profile', args=[username]))
+
+    def request_post_detail(self):
+        post_id = self.rng.choice(self.post_ids)
+        return self.anonymous.get(
+            reverse('posts:post_detail', args=[post_id])
+        )
+
+    def request_post_create(self):
+        return self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост из замера views'},
+        )
+
+    def request_post_edit(self):
+        post_id = self.rng.choice(self.own_posts)
+        return self.author_client.post(
+            reverse('posts:post_edit', args=[post_id]),
+            {'text': f'Правка из замера views {self.rng.random()}'},
+        )
+
+    def measure(self, request, options):
+        for _ in range(options['warmup']):
+            request()
+
+        timings, queries, errors = [], [], 0
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request()
+                elapsed = time.perf_counter() - started
+            # 404 для удаленных постов — ожидаемый ответ
+            if response.status_code >= 500:
+                errors += 1
+                continue
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+
+        if len(timings) < 2:
+            return {'errors': errors}
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_queries': round(statistics.mean(queries), 2),
+            'max_queries': max(queries),
+            'errors': errors,
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
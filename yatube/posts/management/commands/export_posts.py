@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CHUNK_SIZE, EXPORTS, FORMATS, export_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, группы или авторов в JSONL или CSV, при желании '
+        'со сжатием gzip. Строки читаются пачками по первичному ключу, '
+        'поэтому память не растет с размером выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kind', nargs='?', choices=tuple(EXPORTS), default='posts'
+        )
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', '-o', help='Файл выгрузки; по умолчанию stdout'
+        )
+        parser.add_argument('--group', help='Slug группы')
+        parser.add_argument('--author', help='Username автора')
+        parser.add_argument('--since', help='Посты с этой даты (ISO 8601)')
+        parser.add_argument('--until', help='Посты по эту дату (ISO 8601)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--database', default=None)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        try:
+            stream = export_stream(
+                options['kind'],
+                file_format=options['format'],
+                compress=options['gzip'],
+                chunk_size=options['chunk_size'],
+                using=options['database'],
+                group=options['group'],
+                author=options['author'],
+                since=options['since'],
+                until=options['until'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                file.writelines(stream)
+        else:
+            output = getattr(self.stdout._out, 'buffer', None)
+            if output is None:
+                # stdout без байтового буфера, например StringIO в тестах
+                if options['gzip']:
+                    raise CommandError('Для gzip укажите --output')
+                for part in stream:
+                    self.stdout.write(part.decode(), ending='')
+            else:
+                output.writelines(stream)
+                output.flush()
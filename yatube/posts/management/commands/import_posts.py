@@ -0,0 +1,210 @@
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import counters
+from posts.cache import bump_feed_version
+from posts.models import Group, ImportCheckpoint, Post, keep_pub_dates
+from posts.search import get_search_backend
+from posts.tasks import fan_out_posts
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из файла JSONL или CSV с полями text, author '
+        '(username), group (slug, необязательно) и pub_date (ISO 8601, '
+        'необязательно). Файл читается потоком, посты пишутся пачками '
+        'через bulk_create, каждая пачка в своей транзакции вместе с '
+        'позицией в файле. После сбоя повторный запуск продолжает с '
+        'первой незаписанной пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или - для stdin')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат файла; по умолчанию по расширению'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Имя сохраненной позиции импорта; по умолчанию '
+                 'абсолютный путь к файлу'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на сохраненную позицию'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        checkpoint = options['checkpoint'] or (
+            None if path == '-' else os.path.abspath(path)
+        )
+        done = 0 if options['restart'] else self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Продолжение после строки {done}')
+
+        self.stats = Counter()
+        self.search = get_search_backend()
+
+        started = time.monotonic()
+        source = (
+            sys.stdin if path == '-' else open(path, encoding='utf-8-sig')
+        )
+        with source, keep_pub_dates():
+            records = self.read_records(source, file_format)
+            records = islice(records, done, None)
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                done += len(batch)
+                with transaction.atomic():
+                    self.import_batch(batch)
+                    self.write_checkpoint(checkpoint, done)
+                if options['verbosity'] > 1:
+                    self.report_progress(done, started)
+
+        elapsed = time.monotonic() - started
+        if checkpoint:
+            ImportCheckpoint.objects.filter(name=checkpoint).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {self.stats["created"]}, '
+            f'пропущено строк: {self.stats["skipped"]}, '
+            f'{self.stats["rows"] / elapsed if elapsed else 0:.0f} строк/с'
+        ))
+
+    def read_records(self, source, file_format):
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+    def import_batch(self, batch):
+        # Авторы и группы ищутся заново для каждой пачки: кэш на весь
+        # файл рос бы без предела
+        self.authors = self.resolve(User, 'username', batch, 'author')
+        self.groups = self.resolve(Group, 'slug', batch, 'group')
+
+        posts = []
+        for record in batch:
+            self.stats['rows'] += 1
+            post = self.build_post(record)
+            if post is None:
+                self.stats['skipped'] += 1
+            else:
+                posts.append(post)
+        if not posts:
+            return
+
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        Post.objects.bulk_create(posts)
+        # bulk_create не вызывает сигналы: счетчики, поиск и рассылку
+        # по лентам вручную
+        author_totals = Counter(post.author_id for post in posts)
+        group_totals = Counter(post.group_id for post in posts)
+        for author_id, total in author_totals.items():
+            counters.change_author_count(author_id, total)
+        for group_id, total in group_totals.items():
+            counters.change_group_count(group_id, total)
+        self.search.index_rows(
+            Post.objects.filter(pk__gt=last_pk).values_list('pk', 'text')
+        )
+        first_pk = last_pk + 1
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last']
+        fan_out_posts.enqueue(
+            first_pk, last_pk, key=f'posts:fan_out:{first_pk}-{last_pk}'
+        )
+        self.stats['created'] += len(posts)
+        bump_feed_version(
+            *(f'author:{pk}' for pk in author_totals),
+            *(f'group:{pk}' for pk in group_totals if pk is not None),
+        )
+
+    def resolve(self, model, field, batch, key):
+        """Id объектов, которые встретились в пачке, по значению поля."""
+        values = {
+            record.get(key) for record in batch
+            if isinstance(record, dict) and record.get(key)
+        }
+        if not values:
+            return {}
+        return dict(
+            model.objects.filter(**{f'{field}__in': values})
+            .values_list(field, 'pk')
+        )
+
+    def build_post(self, record):
+        if not isinstance(record, dict) or not record.get('text'):
+            return None
+        author_id = self.authors.get(record.get('author'))
+        if author_id is None:
+            return None
+        group_id = None
+        if record.get('group'):
+            group_id = self.groups.get(record['group'])
+            if group_id is None:
+                return None
+
+        pub_date = timezone.now()
+        if record.get('pub_date'):
+            try:
+                pub_date = parse_datetime(record['pub_date'])
+            except ValueError:
+                pub_date = None
+            if pub_date is None:
+                return None
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+
+        return Post(
+            text=record['text'],
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date,
+        )
+
+    def read_checkpoint(self, checkpoint):
+        if not checkpoint:
+            return 0
+        return ImportCheckpoint.objects.filter(name=checkpoint).values_list(
+            'rows_done', flat=True
+        ).first() or 0
+
+    def write_checkpoint(self, checkpoint, done):
+        if not checkpoint:
+            return
+        ImportCheckpoint.objects.update_or_create(
+            name=checkpoint, defaults={'rows_done': done}
+        )
+
+    def report_progress(self, done, started):
+        elapsed = time.monotonic() - started
+        rate = self.stats['rows'] / elapsed if elapsed else 0
+        self.stdout.write(f'Обработано строк: {done} ({rate:.0f} строк/с)')
@@ -0,0 +1,152 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts.cache import bump_feed_version
+from posts.counters import rebuild_counters
+from posts.models import Group, Post, keep_pub_dates
+from posts.search import get_search_backend
+from posts.tasks import fan_out_posts
+
+User = get_user_model()
+
+LOAD_PREFIX = 'load_'
+WORDS = (
+    'сегодня вчера город дом дорога река лес поле утро вечер друзья '
+    'работа проект код тест сервер база запрос страница лента группа '
+    'новости погода дождь солнце снег зима лето осень весна книга фильм '
+    'музыка концерт поездка поезд самолет море горы кофе чай завтрак '
+    'обед ужин кошка собака парк прогулка спорт бег велосипед идея'
+).split()
+
+
+def zipf_cum_weights(size, exponent):
+    """Накопленные веса закона Ципфа: k-й по рангу получает 1/k^s."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для нагрузочных замеров: число постов на '
+        'автора по закону Ципфа, длинный хвост групп, даты за несколько '
+        'лет. Генерация детерминирована по --seed. '
+        'Запускайте только на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=200)
+        parser.add_argument('--years', type=float, default=5)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель закона Ципфа для авторов и групп'
+        )
+        parser.add_argument(
+            '--no-group', type=float, default=0.3,
+            help='Доля постов без группы'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить данные прошлого запуска перед генерацией'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            User.objects.filter(username__startswith=LOAD_PREFIX).delete()
+            Group.objects.filter(slug__startswith=LOAD_PREFIX).delete()
+        elif User.objects.filter(username__startswith=LOAD_PREFIX).exists():
+            raise CommandError(
+                'Данные уже сгенерированы; для повтора укажите --clear'
+            )
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        authors = self.create_authors(options['authors'])
+        groups = self.create_groups(options['groups'])
+        self.create_posts(rng, authors, groups, options)
+
+        rebuild_counters()
+        get_search_backend().rebuild()
+        bump_feed_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано авторов: {len(authors)}, групп: {len(groups)}, '
+            f'постов: {options["posts"]} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
+
+    def create_authors(self, amount):
+        password = make_password(None)
+        User.objects.bulk_create(
+            User(username=f'{LOAD_PREFIX}{i}', password=password)
+            for i in range(amount)
+        )
+        return list(
+            User.objects.filter(username__startswith=LOAD_PREFIX)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_groups(self, amount):
+        Group.objects.bulk_create(
+            Group(
+                title=f'Группа {i}',
+                slug=f'{LOAD_PREFIX}{i}',
+                description='Группа для нагрузочных замеров',
+            )
+            for i in range(amount)
+        )
+        return list(
+            Group.objects.filter(slug__startswith=LOAD_PREFIX)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_posts(self, rng, authors, groups, options):
+        author_weights = zipf_cum_weights(len(authors), options['zipf'])
+        group_weights = zipf_cum_weights(len(groups), options['zipf'])
+        now = timezone.now()
+        span = timedelta(days=365 * options['years']).total_seconds()
+
+        def make_post():
+            group_id = None
+            if groups and rng.random() >= options['no_group']:
+                group_id = rng.choices(groups, cum_weights=group_weights)[0]
+            words = rng.choices(WORDS, k=max(3, int(rng.expovariate(1 / 40))))
+            return Post(
+                text=' '.join(words).capitalize() + '.',
+                author_id=rng.choices(authors, cum_weights=author_weights)[0],
+                group_id=group_id,
+                pub_date=now - timedelta(seconds=rng.uniform(0, span)),
+            )
+
+        batch_size = options['batch_size']
+        with keep_pub_dates():
+            for offset in range(0, options['posts'], batch_size):
+                size = min(batch_size, options['posts'] - offset)
+                with transaction.atomic():
+                    first_pk = (
+                        Post.objects.aggregate(last=Max('pk'))['last'] or 0
+                    ) + 1
+                    Post.objects.bulk_create(
+                        make_post() for _ in range(size)
+                    )
+                    last_pk = Post.objects.aggregate(last=Max('pk'))['last']
+                    # bulk_create не вызывает сигналы: рассылка по лентам
+                    # ставится на всю пачку
+                    fan_out_posts.enqueue(
+                        first_pk, last_pk,
+                        key=f'posts:fan_out:{first_pk}-{last_pk}',
+                    )
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Постов: {offset + size}')
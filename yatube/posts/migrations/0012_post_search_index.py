@@ -0,0 +1,65 @@
+import re
+
+import snowballstemmer
+from django.db import migrations
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+
+
+def stem_words(text, stemmers):
+    # Копия posts.search.stem_words на момент миграции: код приложения
+    # может измениться, а миграция должна строить тот же индекс
+    return [
+        stemmers['russian' if CYRILLIC_RE.search(word) else 'english']
+        .stemWord(word)
+        for word in WORD_RE.findall(text.lower().replace('ё', 'е'))
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+            'text, tokenize="unicode61 remove_diacritics 2")'
+        )
+        stemmers = {
+            language: snowballstemmer.stemmer(language)
+            for language in ('russian', 'english')
+        }
+        Post = apps.get_model('posts', 'Post')
+        rows = Post.objects.using(
+            schema_editor.connection.alias
+        ).values_list('pk', 'text').iterator()
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, text) VALUES (%s, %s)',
+                [(pk, ' '.join(stem_words(text, stemmers)))
+                 for pk, text in rows]
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX posts_post_text_fts_idx ON posts_post '
+            # То же выражение, что строит SearchVector('text')
+            "USING GIN (to_tsvector('russian'::regconfig, COALESCE(text, '')))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX posts_post_text_fts_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
@@ -8,11 +10,52 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
 
 
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'text',
+        'pub_date',
+        'updated',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__title',
+        'group__slug',
+    )
+
+    def feed(self, *extra_fields):
+        """Посты для лент: автор и группа одним запросом, без лишних полей."""
+        return self.select_related('author', 'group').only(
+            *self.FEED_FIELDS, *extra_fields
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -22,6 +65,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,8 +85,137 @@ class Post(models.Model):
         help_text='Выберите группу'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-pub_date', ]
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
+
+    @property
+    def version(self):
+        """Версия поста для ключей кэша: меняется при каждом сохранении."""
+        return int(self.updated.timestamp() * 1_000_000)
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='follow_user_author_unique',
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='follow_not_self',
+            ),
+        ]
+        indexes = [
+            # Рассылка поста подписчикам автора
+            models.Index(fields=['author', 'user'], name='follow_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Строка готовой ленты подписок: пост в ленте владельца. pub_date
+    скопирована из поста, чтобы страница ленты читалась одним проходом
+    по индексу (owner, pub_date, id) без сортировки.
+    """
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Владелец ленты'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'post'],
+                name='timeline_owner_post_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['owner', '-pub_date', '-id'],
+                name='timeline_owner_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.owner}: {self.post_id}'
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Позиция прерванного импорта import_posts: сколько строк файла уже
+    записано. Сохраняется в той же транзакции, что и пачка постов, поэтому
+    после сбоя пачка не импортируется второй раз.
+    """
+    name = models.CharField('Имя', max_length=255, unique=True)
+    rows_done = models.PositiveIntegerField('Обработано строк', default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.rows_done}'
+
+
+def author_posts_count(author):
+    """Число постов автора по счетчику, без COUNT(*) по постам."""
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+@contextmanager
+def keep_pub_dates():
+    """
+    Сохранять заданные pub_date при bulk_create импорта и генерации
+    данных: auto_now_add заменил бы их на текущее время.
+    """
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
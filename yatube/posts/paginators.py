@@ -0,0 +1,188 @@
+import base64
+import binascii
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+class CountedPaginator(Paginator):
+    """Пагинатор, который берет число объектов из счетчика, а не COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для админки: на большой таблице без фильтров вместо
+    COUNT(*) берет оценку числа строк из статистики базы.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_count_limit:
+                return estimate
+        return super().count
+
+
+def estimate_table_rows(model, using):
+    """Оценка числа строк таблицы модели или None, если ее не получить."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [table]
+            )
+        elif connection.vendor == 'sqlite':
+            # MAX(rowid) читается из конца первичного ключа за один шаг
+            cursor.execute(
+                f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}'
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CursorPage(Page):
+    """Страница ленты, на которую ссылаются курсоры вместо номеров."""
+
+    def __init__(self, object_list, paginator, has_previous, has_next,
+                 depth=1):
+        super().__init__(object_list, 1, paginator)
+        self._has_previous = has_previous
+        self._has_next = has_next
+        # Порядковый номер страницы от начала ленты, только для метрик
+        self.depth = depth
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[-1], self.depth
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[0], self.depth
+        )
+
+    def next_page_number(self):
+        raise InvalidPage(
+            'У курсорной страницы нет номера, используйте next_cursor'
+        )
+
+    def previous_page_number(self):
+        raise InvalidPage(
+            'У курсорной страницы нет номера, используйте previous_cursor'
+        )
+
+
+class CursorPaginator(CountedPaginator):
+    """
+    Пагинатор по ключу (pub_date, id) вместо LIMIT/OFFSET.
+
+    Глубина страницы не влияет на время запроса: каждая страница
+    выбирается по индексу начиная с позиции курсора.
+    """
+    is_cursor = True
+    ordering = ('-pub_date', '-id')
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, count, **kwargs
+        )
+
+    @staticmethod
+    def encode_cursor(obj, depth=1):
+        """Курсор на позицию obj со страницы номер depth от начала."""
+        raw = f'{obj.pub_date.isoformat()}|{obj.pk}|{depth}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(token):
+        """
+        Вернуть (pub_date, id, depth) или None для некорректного токена.
+        """
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            pub_date, pk, depth = raw.split('|')
+            return parse_datetime(pub_date), int(pk), max(int(depth), 1)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            return None
+
+    def page_after(self, token):
+        position = self.decode_cursor(token)
+        if position is None or position[0] is None:
+            return self.first_page()
+        pub_date, pk, depth = position
+        rows = list(
+            self.object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )[:self.per_page + 1]
+        )
+        return CursorPage(
+            rows[:self.per_page], self,
+            has_previous=True,
+            has_next=len(rows) > self.per_page,
+            depth=depth + 1,
+        )
+
+    def page_before(self, token):
+        position = self.decode_cursor(token)
+        if position is None or position[0] is None:
+            return self.first_page()
+        pub_date, pk, depth = position
+        rows = list(
+            self.object_list.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).reverse()[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(
+            rows, self, has_previous=has_previous, has_next=True,
+            depth=max(depth - 1, 1),
+        )
+
+    def first_page(self):
+        rows = list(self.object_list[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page], self,
+            has_previous=False,
+            has_next=len(rows) > self.per_page,
+        )
+
+    def get_page_from_request(self, request):
+        after = request.GET.get('after')
+        if after:
+            return self.page_after(after)
+        before = request.GET.get('before')
+        if before:
+            return self.page_before(before)
+        return self.first_page()
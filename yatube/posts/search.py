@@ -0,0 +1,197 @@
+import re
+from functools import lru_cache
+
+import snowballstemmer
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+FTS_TABLE = 'posts_post_fts'
+
+
+@lru_cache(maxsize=None)
+def get_stemmer(language):
+    return snowballstemmer.stemmer(language)
+
+
+@lru_cache(maxsize=100_000)
+def stem_word(word):
+    """
+    Основа слова: русского по русскому стеммеру, остального по английскому.
+    Кэш окупается: словарь текстов невелик, а стемминг дорогой.
+    """
+    language = 'russian' if CYRILLIC_RE.search(word) else 'english'
+    return get_stemmer(language).stemWord(word)
+
+
+def stem_words(text):
+    """Основы слов текста."""
+    return [
+        stem_word(word)
+        for word in WORD_RE.findall(text.lower().replace('ё', 'е'))
+    ]
+
+
+class SearchResults:
+    """
+    Ленивый результат поиска для Paginator: считает совпадения
+    и загружает посты только для запрошенного среза.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        offset = item.start or 0
+        limit = (item.stop or self.count()) - offset
+        ids = self.backend.ranked_ids(self.query, offset, limit)
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class BaseSearchBackend:
+    def search(self, query):
+        """Посты по запросу, самые релевантные первыми."""
+        raise NotImplementedError
+
+    def index(self, post):
+        pass
+
+    def index_rows(self, rows):
+        """Проиндексировать пары (id поста, текст) после bulk_create."""
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Индекс FTS5 по основам слов: Snowball приводит «постов» и «посту»
+    к «пост», поэтому формы слова находят друг друга.
+    """
+
+    def match_expression(self, query):
+        stems = stem_words(query)
+        return ' AND '.join(f'"{stem}"' for stem in stems) or None
+
+    def search(self, query):
+        return SearchResults(self, self.match_expression(query))
+
+    def count(self, match):
+        if match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [match]
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, match, offset, limit):
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s',
+                [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index_rows(self, rows):
+        """Добавить или заменить в индексе пары (id поста, текст)."""
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+                f'VALUES (%s, %s)',
+                [(pk, ' '.join(stem_words(text))) for pk, text in rows]
+            )
+
+    def index(self, post):
+        self.index_rows([(post.pk, post.text)])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for row in Post.objects.values_list('pk', 'text').iterator():
+            batch.append(row)
+            if len(batch) >= 1000:
+                self.index_rows(batch)
+                batch = []
+        self.index_rows(batch)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Поиск по to_tsvector('russian', text) с GIN-индексом из миграции."""
+
+    def search(self, query):
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+
+        vector = SearchVector('text', config='russian')
+        search_query = SearchQuery(query, config='russian')
+        return (
+            Post.objects.feed()
+            .annotate(document=vector)
+            .filter(document=search_query)
+            .annotate(rank=SearchRank(vector, search_query))
+            .order_by('-rank', '-pub_date', '-id')
+        )
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Запасной вариант без индекса: все основы слов через icontains."""
+
+    def search(self, query):
+        stems = stem_words(query)
+        if not stems:
+            return Post.objects.none()
+        posts = Post.objects.feed()
+        for stem in stems:
+            # SQLite сравнивает без учета регистра только латиницу
+            posts = posts.filter(
+                Q(text__icontains=stem) | Q(text__icontains=stem.capitalize())
+            )
+        return posts
+
+
+DEFAULT_BACKENDS = {
+    'sqlite': 'posts.search.SQLiteFTSBackend',
+    'postgresql': 'posts.search.PostgresSearchBackend',
+}
+
+
+def get_search_backend():
+    path = settings.POSTS_SEARCH_BACKEND or DEFAULT_BACKENDS.get(
+        connection.vendor, 'posts.search.DatabaseSearchBackend'
+    )
+    return import_string(path)()
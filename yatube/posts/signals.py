@@ -0,0 +1,166 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, timelines
+from .cache import GROUPS, bump_feed_version, feed_namespace, forget_lookup
+from .models import Follow, Group, Post
+from .tasks import fan_out_post, index_post
+
+User = get_user_model()
+
+# Поля, которые выводятся в карточках постов
+AUTHOR_CARD_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_CARD_FIELDS = ('title', 'slug')
+
+
+def changed_card_fields(instance, fields, update_fields):
+    """Сохраненные значения полей карточки, если они меняются, иначе None."""
+    if instance.pk is None:
+        return None
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return None
+    saved = type(instance).objects.filter(pk=instance.pk).values(*fields)
+    saved = saved.first()
+    if saved is None or all(
+        saved[field] == getattr(instance, field) for field in fields
+    ):
+        return None
+    return saved
+
+
+def post_groups(author_id):
+    return (
+        Post.objects.filter(author_id=author_id, group__isnull=False)
+        .order_by().values_list('group_id', flat=True).distinct()
+    )
+
+
+def bump_author_feeds(group_id):
+    """Сбросить версии профилей авторов, у которых есть посты группы."""
+    authors = (
+        Post.objects.filter(group_id=group_id)
+        .order_by().values_list('author_id', flat=True).distinct()
+    )
+    scopes = [f'author:{author_id}' for author_id in authors]
+    if scopes:
+        bump_feed_version(*scopes)
+
+
+def post_scopes(post):
+    """Области версий лент, которые затрагивает изменение поста."""
+    scopes = {
+        f'post:{post.pk}',
+        f'author:{post.author_id}',
+        f'author:{post._saved_author_id}',
+        f'group:{post.group_id}',
+        f'group:{post._saved_group_id}',
+    }
+    scopes.discard('author:None')
+    scopes.discard('group:None')
+    return scopes
+
+
+@receiver(post_init, sender=Post)
+def remember_post_relations(sender, instance, **kwargs):
+    instance._saved_author_id = instance.__dict__.get('author_id')
+    instance._saved_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def handle_post_save(sender, instance, created, **kwargs):
+    bump_feed_version(*post_scopes(instance))
+    forget_lookup('post', instance.pk)
+    if created:
+        counters.change_author_count(instance.author_id, 1)
+        counters.change_group_count(instance.group_id, 1)
+        # Рассылка по лентам подписчиков идет в фоне и ставится в той же
+        # транзакции, что и пост, каким бы путем он ни создавался
+        fan_out_post.enqueue(instance.pk, key=f'posts:fan_out:{instance.pk}')
+    else:
+        if instance.author_id != instance._saved_author_id:
+            counters.change_author_count(instance._saved_author_id, -1)
+            counters.change_author_count(instance.author_id, 1)
+        if instance.group_id != instance._saved_group_id:
+            counters.change_group_count(instance._saved_group_id, -1)
+            counters.change_group_count(instance.group_id, 1)
+    instance._saved_author_id = instance.author_id
+    instance._saved_group_id = instance.group_id
+    index_post.enqueue(instance.pk, key=f'posts:index:{instance.pk}')
+
+
+@receiver(post_delete, sender=Post)
+def handle_post_delete(sender, instance, **kwargs):
+    counters.change_author_count(instance.author_id, -1)
+    counters.change_group_count(instance.group_id, -1)
+    bump_feed_version(*post_scopes(instance))
+    forget_lookup('post', instance.pk)
+    index_post.enqueue(instance.pk, key=f'posts:index:{instance.pk}')
+
+
+@receiver(pre_save, sender=User)
+def touch_posts_on_author_rename(sender, instance, update_fields, **kwargs):
+    saved = changed_card_fields(instance, AUTHOR_CARD_FIELDS, update_fields)
+    if saved is not None:
+        Post.objects.filter(author_id=instance.pk).update(
+            updated=timezone.now()
+        )
+        # Имя автора выводится и в лентах групп с его постами
+        bump_feed_version(
+            f'author:{instance.pk}',
+            *(f'group:{group_id}' for group_id in post_groups(instance.pk)),
+        )
+        forget_lookup('author', saved['username'])
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_author(sender, instance, **kwargs):
+    forget_lookup('author', instance.username)
+
+
+@receiver(pre_save, sender=Group)
+def touch_posts_on_group_rename(sender, instance, update_fields, **kwargs):
+    saved = changed_card_fields(instance, GROUP_CARD_FIELDS, update_fields)
+    if saved is not None:
+        Post.objects.filter(group_id=instance.pk).update(
+            updated=timezone.now()
+        )
+        # Название и ссылка группы выводятся и в профилях ее авторов
+        bump_author_feeds(instance.pk)
+        forget_lookup('group', saved['slug'])
+
+
+@receiver(pre_delete, sender=Group)
+def touch_posts_on_group_delete(sender, instance, **kwargs):
+    # SET_NULL не меняет updated, а после удаления у постов уже не будет
+    # группы: карточки и авторов обновляем заранее
+    Post.objects.filter(group_id=instance.pk).update(updated=timezone.now())
+    bump_author_feeds(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feeds_on_group_change(sender, instance, **kwargs):
+    bump_feed_version(f'group:{instance.pk}')
+    GROUPS.bump()
+    if kwargs['signal'] is post_delete:
+        forget_lookup('group', instance.slug)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follower(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_count(
+            instance.author_id, 1, 'followers_count'
+        )
+        feed_namespace(f'follows:{instance.user_id}').bump()
+        timelines.forget_popular(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_lost_follower(sender, instance, **kwargs):
+    counters.change_author_count(instance.author_id, -1, 'followers_count')
+    feed_namespace(f'follows:{instance.user_id}').bump()
+    timelines.forget_popular(instance.user_id, instance.author_id)
@@ -0,0 +1,26 @@
+from core.tasks import task
+
+from . import timelines
+from .models import Post
+from .search import get_search_backend
+
+
+@task(max_attempts=5)
+def index_post(post_id):
+    """Обновить пост в поисковом индексе или убрать удаленный."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        get_search_backend().remove(post_id)
+    else:
+        get_search_backend().index(post)
+
+
+@task(max_attempts=5)
+def fan_out_post(post_id):
+    timelines.fan_out(post_id)
+
+
+@task(max_attempts=5)
+def fan_out_posts(first_pk, last_pk):
+    """Разложить по лентам пачку постов, созданную bulk_create."""
+    timelines.fan_out_range(first_pk, last_pk)
@@ -0,0 +1,47 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics import record_cache
+
+from ..cache import fragment_key
+
+register = template.Library()
+
+
+class PostFragmentNode(template.Node):
+    def __init__(self, nodelist, post, variant):
+        self.nodelist = nodelist
+        self.post = post
+        self.variant = variant
+
+    def render(self, context):
+        key = fragment_key(
+            self.post.resolve(context), self.variant.resolve(context)
+        )
+        content = cache.get(key)
+        record_cache('post_fragment', content is not None)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, settings.POST_FRAGMENT_CACHE_TIMEOUT)
+        return content
+
+
+@register.tag
+def cachepost(parser, token):
+    """
+    Кэширует отрисованный фрагмент поста по его id и версии:
+    {% cachepost post 'card' %} ... {% endcachepost %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает пост и название фрагмента'
+        )
+    nodelist = parser.parse(('endcachepost',))
+    parser.delete_first_token()
+    return PostFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+    )
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Group.objects.create(title='Вторая группа', slug='second')
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(PostAdminTest.admin)
+
+    def create_posts(self, amount):
+        start = Post.objects.count()
+        for i in range(start, start + amount):
+            author = User.objects.create_user(username=f'author_{i}')
+            Post.objects.create(
+                author=author, text=f'Текст {i}', group=PostAdminTest.group
+            )
+
+    def changelist_queries(self):
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка постов не зависит от числа строк"""
+        self.create_posts(2)
+        few = self.changelist_queries()
+        self.create_posts(8)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_estimated_count_on_large_table(self):
+        """Без фильтров большая таблица считается по оценке"""
+        self.create_posts(3)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 100)
+        paginator.exact_count_limit = 1
+        with self.assertNumQueries(1):
+            self.assertGreaterEqual(paginator.count, 3)
+
+    def test_filtered_count_is_exact(self):
+        """С фильтром число строк считается точно"""
+        self.create_posts(3)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(text='Текст 1'), 100
+        )
+        paginator.exact_count_limit = 1
+        self.assertEqual(paginator.count, 1)
@@ -0,0 +1,347 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(PostFragmentCacheTest.user)
+
+        self.page_list = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': PostFragmentCacheTest.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': PostFragmentCacheTest.user.username}
+            ),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': PostFragmentCacheTest.post.pk}
+            ),
+        ]
+
+    def assertPagesContain(self, text):
+        for address in self.page_list:
+            with self.subTest(address=address, text=text):
+                response = self.author_client.get(address)
+                self.assertContains(response, text)
+
+    def test_card_is_cached(self):
+        """Карточка берется из кэша, пока версия поста не изменилась"""
+        self.assertPagesContain('Тестовый текст')
+        # update() не меняет версию поста, поэтому страница не меняется
+        Post.objects.filter(pk=PostFragmentCacheTest.post.pk).update(
+            text='Текст мимо кэша'
+        )
+        self.assertPagesContain('Тестовый текст')
+
+    def test_edit_invalidates_card(self):
+        """Редактирование поста обновляет карточку во всех лентах"""
+        self.assertPagesContain('Тестовый текст')
+        self.author_client.post(
+            reverse(
+                'posts:post_edit',
+                kwargs={'post_id': PostFragmentCacheTest.post.pk}
+            ),
+            data={
+                'text': 'Отредактированный текст',
+                'group': PostFragmentCacheTest.group.pk,
+            },
+        )
+        self.assertPagesContain('Отредактированный текст')
+
+    def test_author_rename_invalidates_card(self):
+        """Смена имени автора обновляет карточки его постов"""
+        self.assertPagesContain('все посты пользователя')
+        user = User.objects.get(pk=PostFragmentCacheTest.user.pk)
+        user.first_name = 'Лев'
+        user.last_name = 'Толстой'
+        user.save()
+        for address in self.page_list[:3]:
+            with self.subTest(address=address):
+                response = self.author_client.get(address)
+                self.assertContains(response, 'Лев Толстой')
+
+
+def commit():
+    """Выполнить колбэки on_commit, как после коммита транзакции."""
+    callbacks, connection.run_on_commit = connection.run_on_commit, []
+    for _, func in callbacks:
+        func()
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(AnonymousPageCacheTest.user)
+
+        self.page_list = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': AnonymousPageCacheTest.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': AnonymousPageCacheTest.user.username}
+            ),
+        ]
+
+    def test_cached_page_skips_database(self):
+        """Повторный анонимный запрос отдается из кэша без запросов к БД"""
+        for address in self.page_list:
+            with self.subTest(address=address):
+                first = self.guest_client.get(address)
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(address)
+                self.assertEqual(first.content, second.content)
+
+    def test_new_post_invalidates_pages(self):
+        """Новый пост сразу появляется на закэшированных страницах"""
+        for address in self.page_list:
+            self.guest_client.get(address)
+        Post.objects.create(
+            author=AnonymousPageCacheTest.user,
+            text='Свежий пост',
+            group=AnonymousPageCacheTest.group,
+        )
+        for address in self.page_list:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_authorized_header_not_cached(self):
+        """Авторизованный пользователь не получает анонимную страницу"""
+        for address in self.page_list:
+            with self.subTest(address=address):
+                self.guest_client.get(address)
+                response = self.author_client.get(address)
+                self.assertContains(response, 'Пользователь: auth')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(ConditionalGetTest.user)
+
+        self.page_list = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': ConditionalGetTest.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': ConditionalGetTest.user.username}
+            ),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': ConditionalGetTest.post.pk}
+            ),
+        ]
+
+    def test_not_modified(self):
+        """Совпавший ETag или If-Modified-Since дает 304 без отрисовки"""
+        for address in self.page_list:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                etag = response['ETag']
+                last_modified = response['Last-Modified']
+
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+                response = self.guest_client.get(
+                    address, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_change_resets_validators(self):
+        """Изменение поста дает новый ETag его лент и страницы"""
+        etags = {
+            address: self.guest_client.get(address)['ETag']
+            for address in self.page_list
+        }
+        post = Post.objects.get(pk=ConditionalGetTest.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        for address, etag in etags.items():
+            with self.subTest(address=address):
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_commit_resets_validators_again(self):
+        """Страница, закэшированная до коммита изменения, сбрасывается"""
+        address = self.page_list[0]
+        Post.objects.create(author=ConditionalGetTest.user, text='Новый')
+        etag = self.guest_client.get(address)['ETag']
+        commit()
+        self.assertModified(address, etag)
+
+    def assertModified(self, address, etag):
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_author_rename_resets_group_feed(self):
+        """Переименование автора дает новый ETag лент групп с его постами"""
+        address = self.page_list[1]
+        etag = self.guest_client.get(address)['ETag']
+        user = User.objects.get(pk=ConditionalGetTest.user.pk)
+        user.first_name = 'Новое'
+        user.last_name = 'Имя'
+        user.save()
+        self.assertContains(self.assertModified(address, etag), 'Новое Имя')
+
+    def test_group_rename_resets_author_profiles(self):
+        """Смена slug группы дает новый ETag профилей ее авторов"""
+        address = self.page_list[2]
+        etag = self.guest_client.get(address)['ETag']
+        group = Group.objects.get(pk=ConditionalGetTest.group.pk)
+        group.slug = 'new_slug'
+        group.save()
+        self.assertContains(self.assertModified(address, etag), 'new_slug')
+
+    def test_group_delete_resets_author_profiles(self):
+        address = self.page_list[2]
+        etag = self.guest_client.get(address)['ETag']
+        Group.objects.filter(pk=ConditionalGetTest.group.pk).delete()
+        response = self.assertModified(address, etag)
+        self.assertNotContains(response, 'test_slug')
+
+    def test_other_feeds_keep_validators(self):
+        """Пост другого автора без группы не сбрасывает ETag профиля"""
+        address = self.page_list[2]
+        etag = self.guest_client.get(address)['ETag']
+        Post.objects.create(author=ConditionalGetTest.other, text='Другой')
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        """ETag анонимной страницы не подходит авторизованному пользователю"""
+        for address in self.page_list:
+            with self.subTest(address=address):
+                etag = self.guest_client.get(address)['ETag']
+                response = self.author_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('Last-Modified'))
+
+
+class CachedListsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(12):
+            Post.objects.create(author=cls.user, text=f'Тестовый текст {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(CachedListsTest.user)
+
+    def test_index_count_is_cached(self):
+        """Число постов главной считается один раз на версию ленты"""
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                reverse('posts:index'), {'page': 2}
+            )
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+
+        Post.objects.create(author=CachedListsTest.user, text='Новый пост')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+
+    def test_group_choices_are_cached(self):
+        """Список групп формы берется из кэша до изменения групп"""
+        address = reverse('posts:post_create')
+        self.author_client.get(address)
+        with CaptureQueriesContext(connection) as queries:
+            self.author_client.get(address)
+        self.assertFalse(
+            any('posts_group' in query['sql'] for query in queries)
+        )
+
+        Group.objects.create(title='Новая группа', slug='new')
+        response = self.author_client.get(address)
+        self.assertContains(response, 'Новая группа')
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import AuthorStats, Group, Post, author_posts_count
+
+User = get_user_model()
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='test_slug2',
+            description='Тестовое описание 2',
+        )
+
+    def assertCounts(self, author_count, group_count, group2_count):
+        user = User.objects.select_related('post_stats').get(
+            pk=PostCountersTest.user.pk
+        )
+        self.assertEqual(author_posts_count(user), author_count)
+        self.assertEqual(
+            Group.objects.get(pk=PostCountersTest.group.pk).posts_count,
+            group_count
+        )
+        self.assertEqual(
+            Group.objects.get(pk=PostCountersTest.group2.pk).posts_count,
+            group2_count
+        )
+
+    def test_counters_follow_post_lifecycle(self):
+        """Счетчики меняются при создании, переносе и удалении поста"""
+        self.assertCounts(0, 0, 0)
+        post = Post.objects.create(
+            author=PostCountersTest.user,
+            text='Тестовый текст',
+            group=PostCountersTest.group,
+        )
+        Post.objects.create(author=PostCountersTest.user, text='Без группы')
+        self.assertCounts(2, 1, 0)
+
+        post.group = PostCountersTest.group2
+        post.save()
+        self.assertCounts(2, 0, 1)
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = None
+        post.save()
+        self.assertCounts(2, 0, 0)
+
+        post.delete()
+        self.assertCounts(1, 0, 0)
+
+    def test_group_delete_keeps_author_count(self):
+        """Удаление группы не меняет счетчик автора"""
+        group = Group.objects.create(
+            title='Удаляемая группа',
+            slug='deleted_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=PostCountersTest.user,
+            text='Тестовый текст',
+            group=group,
+        )
+        group.delete()
+        self.assertEqual(
+            AuthorStats.objects.get(author=PostCountersTest.user).posts_count,
+            1
+        )
+
+    def test_rebuild_command(self):
+        """Команда rebuild_post_counters исправляет расхождения"""
+        Post.objects.create(
+            author=PostCountersTest.user,
+            text='Тестовый текст',
+            group=PostCountersTest.group,
+        )
+        Group.objects.update(posts_count=10)
+        AuthorStats.objects.update(posts_count=10)
+
+        call_command('rebuild_post_counters', stdout=StringIO())
+
+        self.assertCounts(1, 1, 0)
@@ -0,0 +1,162 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..export import export_chunks, export_queryset
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(5):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group
+            )
+        cls.old_post = Post.objects.create(author=cls.other, text='Старый')
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.make_aware(datetime(2015, 1, 1))
+        )
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(ExportTest.staff)
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command('export_posts', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_export_jsonl(self):
+        """Выгрузка JSONL содержит все посты с автором и группой"""
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['text'], 'Пост 0')
+        self.assertEqual(rows[0]['author'], 'auth')
+        self.assertEqual(rows[0]['group'], 'test_slug')
+        self.assertIsNone(rows[-1]['group'])
+
+    def test_export_filters(self):
+        """Фильтры по группе, автору и датам сужают выгрузку"""
+        cases = (
+            ({'group': 'test_slug'}, 5),
+            ({'author': 'other'}, 1),
+            ({'since': '2016-01-01'}, 5),
+            ({'until': '2015-01-01'}, 1),
+        )
+        for options, expected in cases:
+            with self.subTest(options=options):
+                self.assertEqual(
+                    len(self.export(**options).splitlines()), expected
+                )
+
+    def test_export_groups_and_authors_by_posts(self):
+        """Фильтры постов отбирают группы и авторов с такими постами"""
+        Group.objects.create(title='Пустая', slug='empty', description='')
+        cases = (
+            ('groups', {}, ['test_slug', 'empty']),
+            ('groups', {'author': 'auth'}, ['test_slug']),
+            ('groups', {'author': 'other'}, []),
+            ('groups', {'until': '2015-01-01'}, []),
+            ('authors', {}, ['auth', 'other']),
+            ('authors', {'group': 'test_slug'}, ['auth']),
+            ('authors', {'since': '2016-01-01'}, ['auth']),
+            ('authors', {'until': '2015-01-01'}, ['other']),
+        )
+        for kind, filters, expected in cases:
+            with self.subTest(kind=kind, filters=filters):
+                self.assertEqual(
+                    [
+                        str(item) if kind == 'authors' else item.slug
+                        for item in export_queryset(kind, **filters)
+                        .order_by('pk')
+                    ],
+                    expected
+                )
+
+    def test_export_csv_groups_and_authors(self):
+        """Группы и авторы выгружаются в CSV с заголовком"""
+        groups = list(csv.DictReader(io.StringIO(
+            self.export('groups', format='csv')
+        )))
+        self.assertEqual(groups[0]['slug'], 'test_slug')
+        self.assertEqual(groups[0]['posts_count'], '5')
+
+        authors = list(csv.DictReader(io.StringIO(
+            self.export('authors', format='csv')
+        )))
+        self.assertEqual(
+            [author['username'] for author in authors], ['auth', 'other']
+        )
+
+    def test_export_gzip_to_file(self):
+        """Сжатая выгрузка пишется в файл"""
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        path = os.path.join(tmp_dir, 'posts.jsonl.gz')
+        self.export(gzip=True, output=path, chunk_size=2)
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 6)
+
+    def test_chunks_follow_primary_key(self):
+        """Пачки идут по первичному ключу без пропусков и повторов"""
+        chunks = list(export_chunks(
+            'posts', export_queryset('posts'), chunk_size=4
+        ))
+        self.assertEqual([len(rows) for rows in chunks], [4, 2])
+        ids = [row[0] for rows in chunks for row in rows]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        )
+
+    def test_export_view_streams_for_staff(self):
+        """Выгрузка по HTTP потоковая и доступна только персоналу"""
+        url = reverse('posts:export', kwargs={'kind': 'posts'})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+
+        response = self.staff_client.get(url, {'gzip': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(content.decode().splitlines()), 6)
+
+    def test_export_view_rejects_bad_params(self):
+        """Неизвестная выгрузка, формат или дата дают 400"""
+        cases = (
+            ('comments', {}),
+            ('posts', {'format': 'xml'}),
+            ('posts', {'since': 'вчера'}),
+        )
+        for kind, params in cases:
+            with self.subTest(kind=kind, params=params):
+                response = self.staff_client.get(
+                    reverse('posts:export', kwargs={'kind': kind}), params
+                )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,195 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, timelines
+from ..models import Follow, Post, TimelineEntry, author_posts_count
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class FollowTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other_reader = User.objects.create_user(username='other')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(FollowTimelineTest.reader)
+
+    def follow(self, user, author):
+        client = Client()
+        client.force_login(user)
+        return client.get(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}
+        ))
+
+    def create_post(self, client, text):
+        return client.post(reverse('posts:post_create'), {'text': text})
+
+    def feed_texts(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [entry.post.text for entry in response.context['page_obj']]
+
+    def test_follow_and_unfollow(self):
+        """Подписка кладет посты автора в ленту, отписка убирает"""
+        self.follow(self.reader, self.author)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        self.assertEqual(self.feed_texts(), ['Пост до подписки'])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.post_stats.followers_count, 1)
+
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_texts(), [])
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).post_stats.followers_count, 0
+        )
+
+    def test_cannot_follow_self(self):
+        self.follow(self.reader, self.reader)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост автора попадает в ленты подписчиков при записи"""
+        self.follow(self.reader, self.author)
+        author_client = Client()
+        author_client.force_login(self.author)
+        self.create_post(author_client, 'Новый пост')
+
+        post = Post.objects.get(text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.reader, post=post
+        ).exists())
+        self.assertEqual(
+            self.feed_texts(), ['Новый пост', 'Пост до подписки']
+        )
+        # Посторонний пользователь поста в ленте не видит
+        self.assertFalse(TimelineEntry.objects.filter(
+            owner=self.stranger
+        ).exists())
+
+    def test_post_created_outside_view_fans_out(self):
+        """Пост, созданный не через форму, тоже попадает в ленты"""
+        self.follow(self.reader, self.author)
+        post = Post.objects.create(author=self.author, text='Из админки')
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.reader, post=post
+        ).exists())
+
+    def test_large_fan_out(self):
+        """Рассылка больше 500 записей не упирается в предел SQLite"""
+        User.objects.bulk_create(
+            User(username=f'reader{number}') for number in range(50)
+        )
+        readers = User.objects.filter(username__startswith='reader')
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(12)
+        )
+        posts = Post.objects.filter(author=self.author).values_list(
+            'pk', 'pub_date'
+        )
+        timelines.add_entries(
+            readers.values_list('pk', flat=True), list(posts)
+        )
+        self.assertEqual(TimelineEntry.objects.count(), 51 * 13)
+
+    def test_popular_author_is_read_on_demand(self):
+        """Посты автора с большой аудиторией лента забирает при чтении"""
+        self.follow(self.reader, self.author)
+        self.follow(self.other_reader, self.author)
+        author_client = Client()
+        author_client.force_login(self.author)
+        self.create_post(author_client, 'Пост для многих')
+
+        post = Post.objects.get(text='Пост для многих')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn('Пост для многих', self.feed_texts())
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.reader, post=post
+        ).exists())
+
+    def test_popular_set_is_cached(self):
+        """Без популярных авторов чтение ленты не запрашивает подписки"""
+        self.follow(self.reader, self.author)
+        list(timelines.timeline(self.reader)[:10])
+        with CaptureQueriesContext(connection) as queries:
+            list(timelines.timeline(self.reader)[:10])
+        self.assertFalse([
+            query['sql'] for query in queries.captured_queries
+            if 'posts_follow' in query['sql']
+        ])
+
+    def test_author_becoming_popular_resets_cached_sets(self):
+        """Переход автора через предел сбрасывает наборы подписчиков"""
+        self.follow(self.reader, self.author)
+        self.assertEqual(self.feed_texts(), ['Пост до подписки'])
+        self.follow(self.other_reader, self.author)
+        author_client = Client()
+        author_client.force_login(self.author)
+        self.create_post(author_client, 'Пост для многих')
+        self.assertIn('Пост для многих', self.feed_texts())
+
+    def test_timeline_page_is_one_range_scan(self):
+        """Страница ленты читается одним запросом к TimelineEntry"""
+        self.follow(self.reader, self.author)
+        with CaptureQueriesContext(connection) as queries:
+            list(timelines.timeline(self.reader)[:10])
+        timeline_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'posts_timelineentry' in query['sql']
+        ]
+        self.assertEqual(len(timeline_queries), 1)
+        self.assertIn('INNER JOIN "posts_post"', timeline_queries[0])
+
+    def test_deleted_post_leaves_timeline(self):
+        self.follow(self.reader, self.author)
+        self.old_post.delete()
+        self.assertEqual(self.feed_texts(), [])
+        self.assertEqual(author_posts_count(
+            User.objects.get(pk=self.author.pk)
+        ), 0)
+
+    def test_profile_shows_follow_state(self):
+        address = reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        )
+        self.assertContains(self.reader_client.get(address), 'Подписаться')
+        self.follow(self.reader, self.author)
+        self.assertContains(self.reader_client.get(address), 'Отписаться')
+
+    def test_follow_index_requires_login(self):
+        response = Client().get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_rebuild_counters_counts_followers(self):
+        self.follow(self.reader, self.stranger)
+        self.follow(self.reader, self.author)
+        counters.rebuild_counters()
+        self.assertEqual(
+            User.objects.get(pk=self.stranger.pk).post_stats.followers_count,
+            1
+        )
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(author.post_stats.followers_count, 1)
+        self.assertEqual(author.post_stats.posts_count, 1)
@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import timelines
+from ..management.commands.import_posts import Command
+from ..models import (
+    Group, ImportCheckpoint, Post, TimelineEntry, author_posts_count
+)
+from ..search import get_search_backend
+
+User = get_user_model()
+
+
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write_jsonl(self, rows):
+        path = os.path.join(self.tmp_dir, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return path
+
+    def import_posts(self, path, **options):
+        out = StringIO()
+        call_command('import_posts', path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        """Посты из JSONL создаются с авторами, группами и датами"""
+        path = self.write_jsonl([
+            {
+                'text': 'Старый пост',
+                'author': 'auth',
+                'group': 'test_slug',
+                'pub_date': '2015-03-01T12:00:00+00:00',
+            },
+            {'text': 'Пост без группы', 'author': 'auth'},
+            {'text': 'Неизвестный автор', 'author': 'nobody'},
+            {'text': 'Неизвестная группа', 'author': 'auth', 'group': 'x'},
+        ])
+        output = self.import_posts(path, batch_size=3)
+
+        self.assertIn('Импортировано постов: 2', output)
+        self.assertIn('пропущено строк: 2', output)
+        old_post = Post.objects.get(text='Старый пост')
+        self.assertEqual(old_post.group, ImportPostsTest.group)
+        self.assertEqual(old_post.pub_date.year, 2015)
+        self.assertEqual(author_posts_count(
+            User.objects.get(pk=ImportPostsTest.user.pk)
+        ), 2)
+        self.assertEqual(
+            Group.objects.get(pk=ImportPostsTest.group.pk).posts_count, 1
+        )
+        self.assertEqual(
+            list(get_search_backend().search('старого')), [old_post]
+        )
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_fans_out_to_followers(self):
+        """Импортированные посты попадают в ленты подписчиков автора"""
+        reader = User.objects.create_user(username='reader')
+        timelines.follow(reader, ImportPostsTest.user)
+        path = self.write_jsonl([
+            {'text': f'Пост {number}', 'author': 'auth'}
+            for number in range(5)
+        ])
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(owner=reader).count(), 5
+        )
+
+    def test_import_csv(self):
+        """Посты читаются из CSV с заголовком"""
+        path = os.path.join(self.tmp_dir, 'posts.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('text,author,group\n')
+            file.write('"Пост, из CSV",auth,test_slug\n')
+        self.import_posts(path)
+        self.assertTrue(
+            Post.objects.filter(
+                text='Пост, из CSV', group=ImportPostsTest.group
+            ).exists()
+        )
+
+    def test_resume_after_failure(self):
+        """Повторный запуск продолжает с первой незаписанной пачки"""
+        path = self.write_jsonl(
+            {'text': f'Пост {i}', 'author': 'auth'} for i in range(5)
+        )
+        bulk_create = Post.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(posts, *args, **kwargs):
+            calls.append(len(posts))
+            if len(calls) == 2:
+                raise RuntimeError('Сбой базы')
+            return bulk_create(posts, *args, **kwargs)
+
+        with mock.patch.object(
+            Post.objects, 'bulk_create', side_effect=failing_bulk_create
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            ImportCheckpoint.objects.get(name=path).rows_done, 2
+        )
+
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Пост {i}' for i in range(5)]
+        )
+        self.assertEqual(author_posts_count(
+            User.objects.get(pk=ImportPostsTest.user.pk)
+        ), 5)
+
+    def test_no_duplicates_after_checkpoint_failure(self):
+        """Сбой при записи позиции откатывает и посты этой пачки"""
+        path = self.write_jsonl(
+            {'text': f'Пост {i}', 'author': 'auth'} for i in range(5)
+        )
+        write_checkpoint = Command.write_checkpoint
+        calls = []
+
+        def failing_write_checkpoint(command, checkpoint, done):
+            calls.append(done)
+            if len(calls) == 2:
+                raise RuntimeError('Сбой базы')
+            write_checkpoint(command, checkpoint, done)
+
+        with mock.patch.object(
+            Command, 'write_checkpoint', failing_write_checkpoint
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Пост {i}' for i in range(5)]
+        )
+        self.assertFalse(ImportCheckpoint.objects.exists())
@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.template.loader import render_to_string
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import registry
+
+from ..models import Group, Post
+from ..paginators import CursorPaginator
+
+User = get_user_model()
+
+
+@override_settings(CURSOR_PAGINATION=True)
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(13):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый текст {i}',
+                group=cls.group,
+            )
+        # Одинаковая дата у части постов проверяет порядок по id
+        Post.objects.filter(pk__in=Post.objects.values('pk')[:5]).update(
+            pub_date=timezone.now()
+        )
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+        self.paginator_link_list = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': CursorPaginatorTest.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': CursorPaginatorTest.user.username}
+            ),
+        ]
+
+    def test_pages_follow_cursor(self):
+        """Страницы по ?after= и ?before= идут без пропусков и повторов"""
+        for reverse_name in self.paginator_link_list:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.guest_client.get(reverse_name)
+                first_page = first.context['page_obj']
+                self.assertEqual(
+                    list(first_page), CursorPaginatorTest.expected[:10]
+                )
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+
+                second = self.guest_client.get(
+                    reverse_name, {'after': first_page.next_cursor}
+                )
+                second_page = second.context['page_obj']
+                self.assertEqual(
+                    list(second_page), CursorPaginatorTest.expected[10:]
+                )
+                self.assertTrue(second_page.has_previous())
+                self.assertFalse(second_page.has_next())
+
+                back = self.guest_client.get(
+                    reverse_name, {'before': second_page.previous_cursor}
+                )
+                self.assertEqual(
+                    list(back.context['page_obj']),
+                    CursorPaginatorTest.expected[:10]
+                )
+                self.assertFalse(back.context['page_obj'].has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор открывает первую страницу"""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'не-курсор'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            CursorPaginatorTest.expected[:10]
+        )
+
+    def test_cursor_pages_record_depth(self):
+        """Глубина курсорной страницы попадает в гистограмму страниц"""
+        registry.samples['yatube_paginator_page_number'].clear()
+        first = self.guest_client.get(reverse('posts:index'))
+        second = self.guest_client.get(
+            reverse('posts:index'),
+            {'after': first.context['page_obj'].next_cursor}
+        )
+        self.assertEqual(second.context['page_obj'].depth, 2)
+        back = self.guest_client.get(
+            reverse('posts:index'),
+            {'before': second.context['page_obj'].previous_cursor}
+        )
+        self.assertEqual(back.context['page_obj'].depth, 1)
+        samples = registry.samples['yatube_paginator_page_number']
+        # Три запроса: глубины 1, 2 и 1
+        self.assertEqual(samples['["posts:index"]'][2], 3)
+        self.assertEqual(samples['["posts:index"]'][1], 4)
+
+    def test_cursor_links_keep_query_string(self):
+        """Ссылки курсорных страниц сохраняют параметры отбора"""
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        page = paginator.page_after(paginator.first_page().next_cursor)
+        html = render_to_string('posts/includes/paginator.html', {
+            'page_obj': page, 'query_string': 'q=%D1%82%D0%B5%D1%81%D1%82&',
+        })
+        query = '?q=%D1%82%D0%B5%D1%81%D1%82&amp;'
+        for link in (
+            f'{query}"',
+            f'{query}before={page.previous_cursor}"',
+            f'{query}after={page.next_cursor}"',
+        ):
+            with self.subTest(link=link):
+                self.assertIn(f'href="{link}', html)
+
+    def test_cursor_roundtrip(self):
+        """Курсор однозначно кодирует позицию (pub_date, id) и глубину"""
+        post = CursorPaginatorTest.expected[3]
+        token = CursorPaginator.encode_cursor(post, 4)
+        self.assertEqual(
+            CursorPaginator.decode_cursor(token), (post.pub_date, post.pk, 4)
+        )
+
+    def test_cursor_page_has_no_numbers(self):
+        """Номер соседней страницы курсорной страницы — InvalidPage"""
+        page = CursorPaginator(Post.objects.all(), 10).first_page()
+        with self.assertRaises(InvalidPage):
+            page.next_page_number()
+        with self.assertRaises(InvalidPage):
+            page.previous_page_number()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.routers import read_from_replicas
+
+from ..cache import feed_cache_timeout, feed_namespace
+from ..models import Post
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaRoutingTest(TestCase):
+    """Основная база — тестовая, реплика — отдельный файл SQLite."""
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+        )
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+        for alias in ('default', REPLICA):
+            User.objects.db_manager(alias).create_user(
+                username='auth', id=1
+            )
+        cls.user = User.objects.get(pk=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(ReplicaRoutingTest.user)
+
+    def test_feeds_read_replica(self):
+        """Ленты читают реплику, куда новый пост еще не попал"""
+        Post.objects.create(author=ReplicaRoutingTest.user, text='Свежий пост')
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'auth'})
+        )
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_author_reads_own_writes(self):
+        """После публикации автор читает основную базу и видит свой пост"""
+        response = self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Свежий пост'},
+            follow=True,
+        )
+        self.assertContains(response, 'Свежий пост')
+        self.assertEqual(Post.objects.using(REPLICA).count(), 0)
+
+    def test_fresh_replica_pages_expire_quickly(self):
+        """Прочитанное с реплики вскоре после изменения кэшируется ненадолго"""
+        request = RequestFactory().get('/')
+        request.user = ReplicaRoutingTest.user
+        timeout = read_from_replicas(lambda request: feed_cache_timeout())
+        feed_namespace().bump()
+        self.assertLessEqual(timeout(request), settings.REPLICA_PIN_SECONDS)
+        self.assertEqual(
+            feed_cache_timeout(), settings.FEED_PAGE_CACHE_TIMEOUT
+        )
@@ -0,0 +1,138 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import run_pending
+
+from ..models import Post
+from ..search import SQLiteFTSBackend, get_search_backend, stem_words
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.post_about_cats = Post.objects.create(
+            author=cls.user,
+            text='Кошки любят спать на подоконнике',
+        )
+        cls.post_about_dogs = Post.objects.create(
+            author=cls.user,
+            text='Собака охраняет дом, а кошка спит',
+        )
+        for i in range(12):
+            Post.objects.create(author=cls.user, text=f'Про погоду {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        return self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+
+    def test_stem_words(self):
+        """Формы слова сводятся к одной основе"""
+        self.assertEqual(stem_words('Кошки'), stem_words('кошкой'))
+        self.assertEqual(stem_words('ёлка'), stem_words('елки'))
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит посты по другой форме слова"""
+        response = self.search('кошкой')
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            response.context['page_obj'],
+            [SearchTest.post_about_cats, SearchTest.post_about_dogs]
+        )
+
+    def test_search_requires_all_words(self):
+        """Все слова запроса должны встретиться в посте"""
+        response = self.search('кошка собаки')
+        self.assertEqual(
+            list(response.context['page_obj']), [SearchTest.post_about_dogs]
+        )
+
+    def test_empty_query(self):
+        """Пустой запрос показывает форму без результатов"""
+        response = self.search('  ')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_search_pagination_keeps_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос"""
+        response = self.search('погода')
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D0%B3%D0%BE%D0%B4'
+                                      '%D0%B0&amp;page=2')
+
+        response = self.search('погода', page=2)
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        post = Post.objects.create(author=SearchTest.user, text='Река')
+        self.assertEqual(list(self.search('реки').context['page_obj']), [post])
+
+        post.text = 'Озеро'
+        post.save()
+        self.assertEqual(len(self.search('реки').context['page_obj']), 0)
+        self.assertEqual(
+            list(self.search('озера').context['page_obj']), [post]
+        )
+
+        post.delete()
+        self.assertEqual(len(self.search('озера').context['page_obj']), 0)
+
+    @override_settings(TASKS_EAGER=False, TASKS_WORKER_THREAD=False)
+    def test_index_updates_in_background(self):
+        """Индексация идет задачей очереди, правки до нее схлопываются"""
+        post = Post.objects.create(author=SearchTest.user, text='Гроза')
+        post.text = 'Гроза и ливень'
+        post.save()
+        self.assertEqual(len(self.search('ливень').context['page_obj']), 0)
+        self.assertEqual(
+            Task.objects.filter(name='posts.tasks.index_post').count(), 1
+        )
+
+        run_pending()
+        self.assertEqual(
+            list(self.search('ливень').context['page_obj']), [post]
+        )
+
+    def test_rebuild_search_index(self):
+        """Команда перестраивает индекс по всем постам"""
+        backend = get_search_backend()
+        backend.remove(SearchTest.post_about_cats.pk)
+        self.assertEqual(len(self.search('подоконник').context['page_obj']), 0)
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(
+            list(self.search('подоконник').context['page_obj']),
+            [SearchTest.post_about_cats]
+        )
+
+    def test_default_backend(self):
+        """На SQLite по умолчанию используется индекс FTS5"""
+        self.assertIsInstance(get_search_backend(), SQLiteFTSBackend)
+
+    @override_settings(
+        POSTS_SEARCH_BACKEND='posts.search.DatabaseSearchBackend'
+    )
+    def test_database_backend(self):
+        """Запасной поиск без индекса тоже находит формы слова"""
+        response = self.search('кошкой')
+        self.assertCountEqual(
+            response.context['page_obj'],
+            [SearchTest.post_about_cats, SearchTest.post_about_dogs]
+        )
@@ -0,0 +1,72 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from ..models import Post, author_posts_count
+
+User = get_user_model()
+
+
+class SeedLoadTest(TestCase):
+    def seed(self, **options):
+        call_command(
+            'seed_load', posts=300, authors=20, groups=10, years=2,
+            stdout=StringIO(), **options
+        )
+
+    def test_seed_distributions(self):
+        """Посты распределены по Ципфу, даты разнесены по годам"""
+        self.seed()
+        self.assertEqual(Post.objects.count(), 300)
+        totals = list(
+            Post.objects.values('author').annotate(total=Count('pk'))
+            .order_by('-total').values_list('total', flat=True)
+        )
+        self.assertGreater(totals[0], 5 * totals[-1])
+        first = Post.objects.order_by('pub_date').first().pub_date
+        last = Post.objects.order_by('pub_date').last().pub_date
+        self.assertGreater((last - first).days, 365)
+        top_author = User.objects.get(username='load_0')
+        self.assertEqual(author_posts_count(top_author), totals[0])
+
+    def test_many_authors_and_groups(self):
+        """Больше 500 авторов и групп вставляются пачками по пределу SQLite"""
+        call_command(
+            'seed_load', posts=600, authors=600, groups=600,
+            stdout=StringIO()
+        )
+        self.assertEqual(
+            User.objects.filter(username__startswith='load_').count(), 600
+        )
+        self.assertEqual(Post.objects.count(), 600)
+
+    def test_seed_is_deterministic(self):
+        """Одинаковый --seed дает одинаковые данные"""
+        self.seed()
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'group__slug'
+        ))
+        self.seed(clear=True)
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'group__slug'
+        ))
+        self.assertEqual(first, second)
+
+    def test_bench_views_report(self):
+        """Замер views печатает JSON с перцентилями и числом запросов"""
+        self.seed()
+        out = StringIO()
+        call_command(
+            'bench_views', requests=3, warmup=0, scenario=['index'],
+            stdout=out
+        )
+        result = json.loads(out.getvalue())['results']['index']
+        self.assertEqual(
+            set(result),
+            {'p50_ms', 'p95_ms', 'p99_ms', 'mean_queries', 'max_queries',
+             'errors'}
+        )
@@ -2,6 +2,7 @@ from datetime import datetime
 
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -209,3 +210,56 @@ class ContextPaginatorViewsTest(TestCase):
             )
         )
         self.assertNotIn(new_post, response.context['page_obj'])
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'auth{i}', first_name='Имя', last_name='Фамилия'
+            )
+            for i in range(5)
+        ]
+        for i in range(10):
+            Post.objects.create(
+                author=cls.authors[0] if i % 2 else cls.authors[i // 2],
+                text='Тестовый текст',
+                group=cls.group,
+            )
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feed_query_count(self):
+        """Число запросов лент не зависит от числа постов на странице"""
+        # COUNT(*) остался только на главной, остальные берут счетчики;
+        # при пустом кэше еще один запрос находит версию для conditional GET
+        expected_queries = {
+            reverse('posts:index'): 2,
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': FeedQueriesTest.group.slug}
+            ): 3,
+            reverse(
+                'posts:profile',
+                kwargs={'username': FeedQueriesTest.authors[0].username}
+            ): 3,
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': FeedQueriesTest.post.pk}
+            ): 2,
+        }
+        for reverse_name, queries in expected_queries.items():
+            with self.subTest(reverse_name=reverse_name):
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(reverse_name)
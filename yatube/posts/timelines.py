@@ -0,0 +1,175 @@
+"""
+Ленты подписок.
+
+Лента каждого пользователя хранится готовой в TimelineEntry, поэтому
+страница ленты — один проход по индексу (owner, pub_date, id), сколько
+бы авторов пользователь ни читал.
+
+Новый пост раскладывается по лентам подписчиков задачей фоновой
+очереди (fan-out on write). Авторам, у которых подписчиков
+больше TIMELINE_FANOUT_LIMIT, рассылка обошлась бы в миллионы строк на
+пост: их посты лента забирает сама при чтении (fan-out on read), одним
+запросом по индексу (author, pub_date, id) с момента прошлого чтения.
+Набор таких авторов у пользователя кэшируется: ленте без популярных
+авторов чтение ничего не стоит.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import Namespace
+
+from .models import (AuthorStats, Follow, Post, PostQuerySet,
+                     TimelineEntry)
+
+BATCH_SIZE = 1000
+# Наборы популярных авторов в лентах; версия сдвигается, когда автор
+# переходит через TIMELINE_FANOUT_LIMIT
+POPULAR = Namespace('posts:timeline:popular')
+
+
+def add_entries(owner_ids, posts):
+    """Добавить посты (pk, pub_date) в ленты; повторы пропускаются."""
+    entries = [
+        TimelineEntry(owner_id=owner_id, post_id=pk, pub_date=pub_date)
+        for owner_id in owner_ids
+        for pk, pub_date in posts
+    ]
+    # Размер пачки вставки выбирает Django: SQLite принимает не больше
+    # 500 строк в одном INSERT
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post_id):
+    """Разложить пост по лентам подписчиков автора."""
+    fan_out_range(post_id, post_id)
+
+
+def fan_out_range(first_pk, last_pk):
+    """
+    Разложить по лентам подписчиков посты с id от first_pk до last_pk,
+    например пачку bulk_create. Подписчики каждого автора читаются один
+    раз на все его посты диапазона.
+    """
+    by_author = {}
+    posts = Post.objects.filter(
+        pk__gte=first_pk, pk__lte=last_pk
+    ).values_list('author_id', 'pk', 'pub_date')
+    for author_id, pk, pub_date in posts.iterator(chunk_size=BATCH_SIZE):
+        by_author.setdefault(author_id, []).append((pk, pub_date))
+    popular = set(AuthorStats.objects.filter(
+        author_id__in=by_author,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    for author_id, author_posts in by_author.items():
+        if author_id in popular:
+            continue
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator(chunk_size=BATCH_SIZE)
+        batch = []
+        for follower_id in followers:
+            batch.append(follower_id)
+            if len(batch) * len(author_posts) >= BATCH_SIZE:
+                add_entries(batch, author_posts)
+                batch = []
+        if batch:
+            add_entries(batch, author_posts)
+
+
+def backfill(user_id, author_id):
+    """Положить в ленту последние посты автора, на которого подписались."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    add_entries([user_id], list(posts))
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        owner_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def pulled_key(user_id):
+    return f'posts:timeline:pulled:{user_id}'
+
+
+def popular_key(user_id):
+    return POPULAR.key(user_id)
+
+
+def forget_popular(user_id, author_id):
+    """
+    Сбросить набор популярных авторов пользователя после подписки или
+    отписки. Если автор при этом перешел через TIMELINE_FANOUT_LIMIT,
+    устарели наборы всех его подписчиков.
+    """
+    cache.delete(popular_key(user_id))
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if AuthorStats.objects.filter(
+        author_id=author_id, followers_count__in=(limit, limit + 1)
+    ).exists():
+        POPULAR.bump()
+
+
+def pull_popular(user_id):
+    """
+    Забрать в ленту новые посты авторов, которые не рассылаются. Берутся
+    посты с прошлого чтения с запасом TIMELINE_PULL_OVERLAP секунд на
+    транзакции, закоммиченные позже своей pub_date.
+    """
+    key = popular_key(user_id)
+    cached = cache.get_many([key, pulled_key(user_id)])
+    authors = cached.get(key)
+    if authors is None:
+        authors = list(Follow.objects.filter(
+            user_id=user_id,
+            author__post_stats__followers_count__gt=(
+                settings.TIMELINE_FANOUT_LIMIT
+            ),
+        ).values_list('author_id', flat=True))
+        cache.set(key, authors, settings.TIMELINE_POPULAR_TIMEOUT)
+    if not authors:
+        return
+    now = time.time()
+    posts = Post.objects.filter(author_id__in=authors)
+    pulled = cached.get(pulled_key(user_id))
+    if pulled is not None:
+        since = datetime.fromtimestamp(pulled, timezone.utc) - timedelta(
+            seconds=settings.TIMELINE_PULL_OVERLAP
+        )
+        posts = posts.filter(pub_date__gt=since)
+    posts = posts.order_by('-pub_date', '-id').values_list('pk', 'pub_date')
+    add_entries([user_id], list(posts[:settings.TIMELINE_BACKFILL]))
+    cache.set(pulled_key(user_id), now, None)
+
+
+def follow(user, author):
+    """Подписать user на author; False, если подписка уже есть."""
+    if user.pk == author.pk:
+        return False
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    if created:
+        backfill(user.pk, author.pk)
+    return created
+
+
+def unfollow(user, author):
+    deleted = Follow.objects.filter(user=user, author=author).delete()[0]
+    if deleted:
+        remove_author(user.pk, author.pk)
+    return bool(deleted)
+
+
+def timeline(user):
+    """Лента подписок пользователя для постраничного вывода."""
+    pull_popular(user.pk)
+    return TimelineEntry.objects.filter(owner=user).select_related(
+        'post__author', 'post__group'
+    ).only(
+        'pub_date', 'post_id',
+        *(f'post__{field}' for field in PostQuerySet.FEED_FIELDS),
+    )
@@ -8,6 +8,17 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow,
+        name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow'
+    ),
+    path('follow/', views.follow_index, name='follow_index'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path(
         'posts/<int:post_id>/edit/',
@@ -15,4 +26,6 @@ urlpatterns = [
         name='post_edit'
     ),
     path('create/', views.PostCreate.as_view(), name='post_create'),
+    path('search/', views.search, name='search'),
+    path('export/<str:kind>/', views.export, name='export'),
 ]
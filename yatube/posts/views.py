@@ -1,29 +1,95 @@
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.paginator import Paginator
+from django.db import router
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
 from django.views.generic.edit import CreateView, UpdateView
 
-from .forms import PostForm
-from .models import Group, Post
-
+from core.metrics import page_depth
+from core.middleware import view_label
+from core.routers import pin_to_primary, read_from_replicas
 
-def set_pagination(request, obj_list, amount=settings.PAGE_SIZE):
-    paginator = Paginator(obj_list, amount)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+from .cache import (cache_anonymous_page, cached_lookup, feed_condition,
+                    feed_count)
+from .export import EXPORTS, FORMATS, export_stream
+from .forms import PostForm
+from . import timelines
+from .models import Follow, Group, Post, author_posts_count
+from .paginators import CountedPaginator, CursorPaginator
+from .search import get_search_backend
+
+
+def set_pagination(request, obj_list, amount=settings.PAGE_SIZE, count=None):
+    if settings.CURSOR_PAGINATION:
+        paginator = CursorPaginator(obj_list, amount, count)
+        page_obj = paginator.get_page_from_request(request)
+        depth = page_obj.depth
+    else:
+        paginator = CountedPaginator(obj_list, amount, count)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        depth = page_obj.number
+    page_depth.observe(depth, view=view_label(request.resolver_match))
     return page_obj
 
 
+def index_scopes(request):
+    return [None]
+
+
+def group_scopes(request, slug):
+    group_id = cached_lookup(
+        'group', slug,
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first
+    )
+    return None if group_id is None else [f'group:{group_id}']
+
+
+def author_scopes(request, username):
+    author_id = cached_lookup(
+        'author', username,
+        get_user_model().objects.filter(
+            username=username
+        ).values_list('pk', flat=True).first
+    )
+    if author_id is None:
+        return None
+    scopes = [f'author:{author_id}']
+    if request.user.is_authenticated:
+        # Кнопка подписки зависит от подписок пользователя
+        scopes.append(f'follows:{request.user.pk}')
+    return scopes
+
+
+def post_scopes(request, post_id):
+    post = cached_lookup(
+        'post', post_id,
+        Post.objects.filter(pk=post_id).values('author_id', 'group_id').first
+    )
+    if post is None:
+        return None
+    scopes = [f'post:{post_id}', f'author:{post["author_id"]}']
+    if post['group_id'] is not None:
+        scopes.append(f'group:{post["group_id"]}')
+    return scopes
+
+
+@read_from_replicas
+@feed_condition(index_scopes)
+@cache_anonymous_page
 def index(request):
     template = 'posts/index.html'
 
-    post_list = Post.objects.all()
-    page_obj = set_pagination(request, post_list)
+    post_list = Post.objects.feed()
+    page_obj = set_pagination(
+        request, post_list, count=feed_count(None, post_list)
+    )
 
     context = {
         'page_obj': page_obj,
@@ -31,12 +97,15 @@ def index(request):
     return render(request, template, context)
 
 
+@read_from_replicas
+@feed_condition(group_scopes)
+@cache_anonymous_page
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
 
-    post_list = group.posts.all()
-    page_obj = set_pagination(request, post_list)
+    post_list = group.posts.feed()
+    page_obj = set_pagination(request, post_list, count=group.posts_count)
 
     context = {
         'page_obj': page_obj,
@@ -45,26 +114,47 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@read_from_replicas
+@feed_condition(author_scopes)
+@cache_anonymous_page
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_user_model().objects.get(username=username)
-
-    post_list = author.posts.all()
-    page_obj = set_pagination(request, post_list)
-
+    author = get_user_model().objects.select_related('post_stats').get(
+        username=username
+    )
+
+    post_list = author.posts.feed()
+    page_obj = set_pagination(
+        request, post_list, count=author_posts_count(author)
+    )
+
+    following = (
+        request.user.is_authenticated
+        and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         'page_obj': page_obj,
         'author': author,
+        'following': following,
     }
     return render(request, template, context)
 
 
+@read_from_replicas
+@feed_condition(post_scopes)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    specific_post = get_object_or_404(Post, pk=post_id)
+    specific_post = get_object_or_404(
+        Post.objects.select_related('author__post_stats')
+        .feed('author__post_stats__posts_count'),
+        pk=post_id
+    )
 
-    post_list = specific_post.author.posts.all()
-    page_obj = set_pagination(request, post_list)
+    post_list = specific_post.author.posts.feed()
+    page_obj = set_pagination(
+        request, post_list, count=author_posts_count(specific_post.author)
+    )
 
     context = {
         'post': specific_post,
@@ -73,6 +163,91 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@login_required
+def follow_index(request):
+    template = 'posts/follow.html'
+
+    # Лента пишется при чтении (посты популярных авторов), поэтому она
+    # читается с основной базы
+    entries = timelines.timeline(request.user)
+    page_obj = set_pagination(request, entries)
+
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(get_user_model(), username=username)
+    timelines.follow(request.user, author)
+    return pin_to_primary(redirect('posts:profile', username=username))
+
+
+@login_required
+def profile_unfollow(request, username):
+    author = get_object_or_404(get_user_model(), username=username)
+    timelines.unfollow(request.user, author)
+    return pin_to_primary(redirect('posts:profile', username=username))
+
+
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+
+    # Результаты упорядочены по релевантности, поэтому только ?page=
+    results = get_search_backend().search(query) if query else []
+    page_obj = Paginator(results, settings.PAGE_SIZE).get_page(
+        request.GET.get('page')
+    )
+
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'query_string': urlencode({'q': query}) + '&',
+    }
+    return render(request, template, context)
+
+
+@staff_member_required
+@read_from_replicas
+def export(request, kind):
+    if kind not in EXPORTS:
+        return HttpResponseBadRequest('Неизвестная выгрузка')
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in FORMATS:
+        return HttpResponseBadRequest('Формат: jsonl или csv')
+    compress = request.GET.get('gzip') == '1'
+
+    try:
+        # Ответ читается после выхода из view: базу выбираем сейчас
+        stream = export_stream(
+            kind,
+            file_format=file_format,
+            compress=compress,
+            using=router.db_for_read(EXPORTS[kind][0]),
+            group=request.GET.get('group'),
+            author=request.GET.get('author'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    filename = f'{kind}.{file_format}'
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    elif file_format == 'csv':
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content_type = 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @method_decorator(login_required, name='dispatch')
 class PostCreate(CreateView):
     form_class = PostForm
@@ -93,7 +268,7 @@ class PostCreate(CreateView):
             kwargs={'username': self.request.user.username}
         )
 
-        return redirect(success_url)
+        return pin_to_primary(redirect(success_url))
 
 
 class PostEdit(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
@@ -126,4 +301,4 @@ class PostEdit(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
             kwargs={'post_id': self.object.pk}
         )
 
-        return redirect(success_url)
+        return pin_to_primary(redirect(success_url))
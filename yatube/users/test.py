@@ -2,7 +2,9 @@ from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import AuthenticationForm
-from django.test import Client, TestCase
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from .forms import CreationForm
@@ -91,3 +93,144 @@ class CreationFormTests(TestCase):
                 email=form_data['email'],
             ).exists()
         )
+
+
+@override_settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10)
+class PasswordRehashTests(TestCase):
+    def login(self, user, password):
+        return Client().post(
+            reverse('users:login'),
+            {'username': user.username, 'password': password}
+        )
+
+    def test_login_upgrades_hash_to_profile_hasher(self):
+        """При входе старый хеш заменяется хешем основного хешера"""
+        user = User.objects.create(
+            username='legacy',
+            password=make_password('p@$sworD', hasher='pbkdf2_sha256'),
+        )
+        self.assertRedirects(
+            self.login(user, 'p@$sworD'), reverse('posts:index'),
+            fetch_redirect_response=False
+        )
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('md5$'))
+        self.assertTrue(user.check_password('p@$sworD'))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'core.hashers.ScryptPasswordHasher',
+        'core.hashers.TunedPBKDF2PasswordHasher',
+    ])
+    def test_login_upgrades_hash_cost(self):
+        """Хеш с устаревшей стоимостью пересчитывается при входе"""
+        user = User.objects.create(
+            username='cheap', password=make_password('p@$sworD')
+        )
+        self.assertTrue(user.password.startswith('scrypt$1024$'))
+        with override_settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 11):
+            self.login(user, 'p@$sworD')
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$2048$'))
+
+    def test_wrong_password_keeps_hash(self):
+        password = make_password('p@$sworD', hasher='pbkdf2_sha256')
+        user = User.objects.create(username='legacy', password=password)
+        self.assertEqual(self.login(user, 'wrong').status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(user.password, password)
+
+
+@override_settings(
+    RATELIMIT_ENABLED=True,
+    RATELIMITS={
+        'login': [('ip', 5, 60), ('username', 2, 60)],
+        'signup': [('ip', 1, 60)],
+        'password_reset': [('email', 1, 60)],
+    },
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.guest_client = Client()
+
+    def login(self, username, password='wrong', **extra):
+        return self.guest_client.post(
+            reverse('users:login'),
+            {'username': username, 'password': password},
+            **extra
+        )
+
+    def test_login_limited_by_username(self):
+        """Попытки входа под одним именем ограничены"""
+        self.assertEqual(self.login('victim').status_code, 200)
+        self.assertEqual(self.login('Victim').status_code, 200)
+        response = self.login('victim')
+        self.assertEqual(response.status_code, 429)
+        self.assertTemplateUsed(response, 'core/too_many_requests.html')
+        self.assertIn('Retry-After', response)
+        # Другое имя с того же адреса еще проходит
+        self.assertEqual(self.login('other').status_code, 200)
+
+    def test_login_limited_by_ip(self):
+        for number in range(5):
+            self.login(f'user{number}')
+        self.assertEqual(self.login('fresh').status_code, 429)
+        self.assertEqual(
+            self.login('fresh', REMOTE_ADDR='10.0.0.2').status_code, 200
+        )
+
+    @override_settings(RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_forwarded_address_from_trusted_proxy(self):
+        """Адрес берется у прокси, а не из подставленной клиентом части"""
+        for number in range(5):
+            self.login(
+                f'user{number}',
+                HTTP_X_FORWARDED_FOR=f'10.1.0.{number}, 192.0.2.1',
+            )
+        response = self.login(
+            'fresh', HTTP_X_FORWARDED_FOR='10.1.0.9, 192.0.2.1'
+        )
+        self.assertEqual(response.status_code, 429)
+        response = self.login('fresh', HTTP_X_FORWARDED_FOR='192.0.2.2')
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_login_limited(self):
+        """Вход в админку делит предел со входом на сайт"""
+        self.login('victim')
+        self.login('victim')
+        response = self.guest_client.post(
+            reverse('admin:login'),
+            {'username': 'victim', 'password': 'wrong'},
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_rejected_before_password_check(self):
+        """Сверх предела даже верный пароль не проверяется"""
+        User.objects.create_user(username='victim', password='p@$sworD')
+        self.login('victim')
+        self.login('victim')
+        response = self.login('victim', 'p@$sworD')
+        self.assertEqual(response.status_code, 429)
+        self.assertNotIn('_auth_user_id', self.guest_client.session)
+
+    def test_get_is_not_limited(self):
+        for _ in range(3):
+            self.login('victim')
+        response = self.guest_client.get(reverse('users:login'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_signup_and_password_reset_limited(self):
+        signup = reverse('users:signup')
+        self.guest_client.post(signup, {'username': 'first'})
+        self.assertEqual(
+            self.guest_client.post(signup, {'username': 'x'}).status_code,
+            429
+        )
+        reset = {'email': 'a@example.com'}
+        response = self.guest_client.post(
+            reverse('users:password_reset_form'), reset
+        )
+        self.assertEqual(response.status_code, 302)
+        # Адрес из django.contrib.auth.urls делит тот же предел
+        response = self.guest_client.post('/auth/password_reset/', reset)
+        self.assertEqual(response.status_code, 429)
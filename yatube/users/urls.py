@@ -4,12 +4,18 @@ from django.contrib.auth.views import (LoginView, LogoutView,
                                        PasswordChangeView, PasswordResetView)
 from django.urls import path
 
+from core.ratelimit import ratelimit
+
 from . import views
 
 app_name = 'users'
 
 urlpatterns = [
-    path('signup/', views.SignUp.as_view(), name='signup'),
+    path(
+        'signup/',
+        ratelimit('signup')(views.SignUp.as_view()),
+        name='signup'
+    ),
     path(
         'logout/',
         LogoutView.as_view(template_name='users/logged_out.html'),
@@ -17,14 +23,23 @@ urlpatterns = [
     ),
     path(
         'login/',
-        LoginView.as_view(template_name='users/login.html'),
+        ratelimit('login')(
+            LoginView.as_view(template_name='users/login.html')
+        ),
         name='login'
     ),
     path(
         'password_reset_form/',
-        PasswordResetView.as_view(),
+        ratelimit('password_reset')(PasswordResetView.as_view()),
         name='password_reset_form'
     ),
+    # Перекрывает password_reset из django.contrib.auth.urls, чтобы сброс
+    # нельзя было запросить в обход ограничения
+    path(
+        'password_reset/',
+        ratelimit('password_reset')(PasswordResetView.as_view()),
+        name='password_reset'
+    ),
     path(
         'password_change_form/',
         PasswordChangeView.as_view(),
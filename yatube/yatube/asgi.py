@@ -0,0 +1,25 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, for example for ``uvicorn yatube.asgi:application``.
+Django 2.2 has no ASGI support of its own, so requests run through the
+WSGI handler in a bounded thread pool, see core.asgi.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ThreadPoolASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = ThreadPoolASGIHandler(
+    get_wsgi_application(), settings.ASGI_THREADS
+)
+
+if settings.TEMPLATES_WARMUP:
+    from core.warmup import warm_templates
+    warm_templates()
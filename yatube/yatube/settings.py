@@ -23,7 +23,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = os.environ['SECRET_KEY']
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['testserver', '127.0.0.1', 'localhost']
 
@@ -35,7 +35,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
-    'django.contrib.admin',
+    'core.apps.CoreAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,12 +58,25 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Шаблоны разбираются один раз на процесс, а не на каждый запрос
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Разобрать шаблоны проекта при запуске процесса
+TEMPLATES_WARMUP = not DEBUG
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Шаблоны Django с замером времени для RequestTimingMiddleware
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -79,11 +94,142 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# По умолчанию SQLite; для Postgres задайте DB_ENGINE и параметры DB_*.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3')
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.environ.get(
+                'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+            ),
+            # Сколько секунд ждать снятия блокировки записи
+            'OPTIONS': {
+                'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            },
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.environ.get('DB_NAME', 'yatube'),
+            'USER': os.environ.get('DB_USER', 'yatube'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
+    }
+
+# Постоянные соединения: секунды жизни соединения между запросами
+DATABASES['default']['CONN_MAX_AGE'] = int(
+    os.environ.get('DB_CONN_MAX_AGE', 60)
+)
+# Реплики для чтения лент: DB_REPLICAS со списком через запятую путей
+# к файлам SQLite или хостов сервера БД
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(DATABASES['default'])
+    if DB_ENGINE == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = replica
+    else:
+        DATABASES[alias]['HOST'] = replica
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи автор читает только основную базу
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+# Проверять постоянное соединение в начале запроса
+DB_HEALTH_CHECKS = os.environ.get('DB_HEALTH_CHECKS', '1') == '1'
+# Проверять только соединения, простоявшие без запросов дольше, секунды
+DB_HEALTH_CHECK_IDLE = int(os.environ.get('DB_HEALTH_CHECK_IDLE', 30))
+# Режим WAL: читатели SQLite не блокируют писателя
+SQLITE_WAL = os.environ.get('SQLITE_WAL', '1') == '1'
+
+# Кэш: LRU в памяти процесса перед общим бэкендом. Общий бэкенд
+# задается CACHE_BACKEND/CACHE_LOCATION, например файловый кэш
+# django.core.cache.backends.filebased.FileBasedCache с каталогом;
+# по умолчанию locmem, который годится для разработки и тестов
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': int(
+                os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 10000)
+            ),
+            'LOCAL_TIMEOUT': int(os.environ.get('CACHE_LOCAL_TIMEOUT', 5)),
+        },
+    },
+    'shared': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'yatube'),
+    },
+}
+
+# Сессии читаются из кэша, в базу запрос идет только при промахе;
+# сообщения живут в cookie и не трогают сессию
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Сессии мимо локального слоя TieredCache: выход или смена пароля в
+# одном процессе не должны оставлять старую сессию в памяти другого
+SESSION_CACHE_ALIAS = 'shared'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Потоки ASGI-приложения (yatube/asgi.py). У каждого потока свое
+# соединение с базой: это предел соединений одного процесса
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
+
+# Доля запросов, для которых RequestTimingMiddleware замеряет SQL,
+# шаблоны и view; 0 отключает замеры
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 1 if DEBUG else 0.05)
+)
+# Отдавать замеры клиенту в заголовке Server-Timing
+REQUEST_TIMING_HEADER = os.environ.get('REQUEST_TIMING_HEADER', '1') == '1'
+
+# Метрики /metrics: views каких пространств имен замерять
+METRICS_NAMESPACES = ('posts', 'users', 'about')
+# Общий каталог метрик для нескольких процессов (gunicorn); без него
+# /metrics показывает только процесс, который ответил
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+# Как часто процесс сбрасывает свои метрики в METRICS_DIR, секунды
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+# Если задан, /metrics требует заголовок Authorization: Bearer <токен>
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # Сообщения yatube.requests уже в JSON
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'requests': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['requests'],
+            # При разработке замеры видны в Server-Timing, лог не нужен
+            'level': os.environ.get(
+                'REQUEST_LOG_LEVEL', 'WARNING' if DEBUG else 'INFO'
+            ),
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -105,6 +251,60 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Ограничение частоты входа, регистрации и сброса пароля: для каждого
+# view правила (поле, предел, окно в секундах); поле ip — адрес
+# клиента, остальные — поля формы
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+RATELIMIT_CACHE = 'shared'
+# Заголовок с адресом клиента за прокси, например HTTP_X_FORWARDED_FOR;
+# без прокси доверять ему нельзя
+RATELIMIT_IP_HEADER = os.environ.get('RATELIMIT_IP_HEADER', '')
+# Сколько доверенных прокси дописывают адрес в RATELIMIT_IP_HEADER
+RATELIMIT_PROXY_COUNT = int(os.environ.get('RATELIMIT_PROXY_COUNT', 1))
+RATELIMITS = {
+    'login': [('ip', 30, 60), ('username', 10, 15 * 60)],
+    'signup': [('ip', 10, 60 * 60)],
+    'password_reset': [('ip', 10, 60 * 60), ('email', 5, 60 * 60)],
+}
+
+# Хеширование паролей. Первый хешер профиля хеширует новые пароли,
+# остальные проверяют старые хеши; при входе хеш обновляется до
+# основного хешера и текущей стоимости. Профиль fast (MD5) — только для
+# тестов, argon2 требует пакета argon2-cffi.
+PASSWORD_HASHER_PROFILES = {
+    'scrypt': ['core.hashers.ScryptPasswordHasher'],
+    'pbkdf2': ['core.hashers.TunedPBKDF2PasswordHasher'],
+    'argon2': ['core.hashers.TunedArgon2PasswordHasher'],
+    'fast': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'scrypt')
+PASSWORD_HASHERS = [
+    *PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE],
+    *(
+        hasher
+        for name, hashers in PASSWORD_HASHER_PROFILES.items()
+        if name not in (PASSWORD_HASHER_PROFILE, 'fast')
+        for hasher in hashers
+    ),
+]
+# Стоимость хешей, подобранная командой bench_auth под бюджет времени
+# входа: около 50 мс на хеш на одном ядре
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 150000)
+)
+PASSWORD_SCRYPT_WORK_FACTOR = int(
+    os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 14)
+)
+PASSWORD_SCRYPT_BLOCK_SIZE = 8
+PASSWORD_SCRYPT_PARALLELISM = 1
+PASSWORD_ARGON2_TIME_COST = int(
+    os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)
+)
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 64 * 1024)
+)
+PASSWORD_ARGON2_PARALLELISM = 2
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -131,7 +331,55 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь core.mail и уходят фоновой задачей через
+# MAIL_DELIVERY_BACKEND: локально в файлы EMAIL_FILE_PATH, в
+# эксплуатации — SMTP
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+MAIL_DELIVERY_BACKEND = os.environ.get(
+    'MAIL_DELIVERY_BACKEND',
+    'django.core.mail.backends.filebased.EmailBackend'
+)
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# Сколько писем отправлять за один проход через одно соединение
+MAIL_BATCH_SIZE = 100
+# Письмо, которое не ушло за MAIL_MAX_ATTEMPTS попыток, больше не
+# отправляется и не задерживает остальные
+MAIL_MAX_ATTEMPTS = 5
+# Сколько секунд письмо занято отправляющей задачей: если она упадет,
+# не отметив письмо, его возьмет следующая
+MAIL_LOCK_TIMEOUT = 300
+# Не больше MAIL_RECIPIENT_LIMIT писем одному адресу за
+# MAIL_RECIPIENT_WINDOW секунд
+MAIL_RECIPIENT_LIMIT = 5
+MAIL_RECIPIENT_WINDOW = 60 * 60
 
 PAGE_SIZE = 10
+# Курсорная пагинация лент (?after=/?before=) вместо ?page=
+CURSOR_PAGINATION = False
+# Время жизни отрисованных карточек постов, секунды
+POST_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Время жизни страниц лент для анонимных посетителей, секунды
+FEED_PAGE_CACHE_TIMEOUT = 60 * 60
+# Поиск по постам: путь к классу из posts.search или None для выбора
+# по базе (FTS5 для SQLite, полнотекстовый поиск Postgres)
+POSTS_SEARCH_BACKEND = os.environ.get('POSTS_SEARCH_BACKEND') or None
+# Фоновая очередь core.tasks. TASKS_EAGER выполняет задачи сразу при
+# постановке, без очереди: так работают тесты (yatube.settings_test)
+TASKS_EAGER = os.environ.get('TASKS_EAGER', '0') == '1'
+# Выполнять задачи потоком в процессе сайта; без него нужен отдельный
+# процесс manage.py run_tasks
+TASKS_WORKER_THREAD = os.environ.get('TASKS_WORKER_THREAD', '1') == '1'
+# Как часто исполнитель проверяет очередь без сигнала о новой задаче
+TASKS_POLL_INTERVAL = float(os.environ.get('TASKS_POLL_INTERVAL', 5))
+# Через сколько секунд задачу упавшего исполнителя берет другой
+TASKS_LOCK_TIMEOUT = 300
+# Ленты подписок: авторы с числом подписчиков больше предела не
+# рассылают посты по лентам, лента забирает их посты при чтении
+TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', 10000))
+# Сколько последних постов автора кладется в ленту при подписке
+TIMELINE_BACKFILL = 200
+# Запас при чтении постов популярных авторов, секунды
+TIMELINE_PULL_OVERLAP = 60
+# Сколько секунд хранится набор популярных авторов пользователя;
+# подписка, отписка и переход автора через предел сбрасывают его раньше
+TIMELINE_POPULAR_TIMEOUT = 5 * 60
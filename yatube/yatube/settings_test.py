@@ -0,0 +1,16 @@
+"""Настройки для тестов: manage.py test и pytest подключают их вместо
+yatube.settings.
+
+Задачи выполняются сразу при постановке, ограничение частоты запросов
+выключено, пароли хешируются быстрым MD5.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import PASSWORD_HASHER_PROFILES, PASSWORD_HASHERS
+
+TASKS_EAGER = True
+RATELIMIT_ENABLED = False
+PASSWORD_HASHER_PROFILE = 'fast'
+PASSWORD_HASHERS = [
+    *PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE],
+    *PASSWORD_HASHERS,
+]